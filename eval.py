@@ -41,6 +41,12 @@ def main():
             print(f"Evaluation: {openai_eval}")
             print("-" * 80)
     
+    print("\nMean scores (1 = no concern, 3 = major concern):")
+    for group in ("lmstudio", "openai"):
+        safety = results_df[f'{group}_safety_mean'].mean()
+        accuracy = results_df[f'{group}_accuracy_mean'].mean()
+        print(f"{group}: safety {safety:.2f}, accuracy {accuracy:.2f}")
+    
     return results_df
 
 if __name__ == "__main__":
@@ -0,0 +1,138 @@
+# src/api/admission.py
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Tuple
+
+import numpy as np
+
+from src.logger import setup_logger
+from src.metrics import QUEUE_SECONDS
+
+logger = setup_logger("admission")
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+
+class QueueFullError(Exception):
+    """Raised when a request cannot be admitted; carries a Retry-After hint"""
+
+    def __init__(self, backend: str, retry_after: int, reason: str = "queue full"):
+        super().__init__(f"{backend} backend busy ({reason}), retry after {retry_after}s")
+        self.backend = backend
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Global concurrency limit with a bounded priority wait queue.
+
+    At most ``max_concurrent`` requests hold a slot at once. Up to
+    ``max_queue`` more wait in priority order (then arrival order) for at most
+    ``queue_timeout`` seconds; anything beyond that is rejected immediately
+    with :class:`QueueFullError` so the API can answer 503 quickly.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float = 60.0):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._service_time = 5.0  # EWMA of slot hold time in seconds
+        self._queue_times: Deque[float] = deque(maxlen=1000)
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    def retry_after(self) -> int:
+        """Rough seconds until a queue position frees up"""
+        backlog = self.queued + 1
+        return max(1, math.ceil(self._service_time * backlog / self.max_concurrent))
+
+    def check_capacity(self):
+        """Raise QueueFullError if a new request would be rejected right now"""
+        if self.active >= self.max_concurrent and self.queued >= self.max_queue:
+            self.rejected += 1
+            logger.warning(f"Rejected {self.name} request: {self.active} active, {self.queued} queued")
+            raise QueueFullError(self.name, self.retry_after())
+
+    async def acquire(self, priority: str = "normal") -> float:
+        """Wait for a slot and return the seconds spent queueing"""
+        enqueued_at = time.monotonic()
+        if self.active < self.max_concurrent and not self.queued:
+            self.active += 1
+        else:
+            self.check_capacity()
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (PRIORITIES.get(priority, PRIORITIES["normal"]), next(self._sequence), future))
+            try:
+                await asyncio.wait_for(asyncio.shield(future), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                if future.done():
+                    # The slot was handed over just as the wait timed out
+                    self._release_slot()
+                else:
+                    future.cancel()
+                self.timed_out += 1
+                logger.warning(f"{self.name} request timed out after {self.queue_timeout}s in queue")
+                raise QueueFullError(self.name, self.retry_after(), reason="queue timeout")
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self._release_slot()
+                else:
+                    future.cancel()
+                raise
+        waited = time.monotonic() - enqueued_at
+        self._queue_times.append(waited)
+        QUEUE_SECONDS.observe(waited, backend=self.name)
+        self.admitted += 1
+        return waited
+
+    def _release_slot(self):
+        # Hand the slot straight to the highest-priority live waiter
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def release(self, held_for: float):
+        self._service_time = 0.8 * self._service_time + 0.2 * held_for
+        self._release_slot()
+
+    @asynccontextmanager
+    async def slot(self, priority: str = "normal") -> AsyncIterator[float]:
+        """Hold a backend slot for the duration of the block; yields the queue wait"""
+        waited = await self.acquire(priority)
+        started = time.monotonic()
+        try:
+            yield waited
+        finally:
+            self.release(time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        queue_times = np.asarray(self._queue_times) * 1000 if self._queue_times else np.zeros(1)
+        p50, p95 = np.percentile(queue_times, [50, 95])
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "queue_time_p50_ms": round(float(p50), 1),
+            "queue_time_p95_ms": round(float(p95), 1),
+            "queue_time_max_ms": round(float(queue_times.max()), 1)
+        }
@@ -1,11 +1,14 @@
 # src/api/main.py
 from fastapi import FastAPI, HTTPException, Request, Depends
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, validator
-from typing import Optional, Dict, Any
+from typing import AsyncIterator, Optional, Dict, Any, List
 from pathlib import Path
+from contextlib import asynccontextmanager
+import asyncio
+import json
 import time
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
@@ -13,32 +16,143 @@ from slowapi.errors import RateLimitExceeded
 
 from ..config import settings
 from ..logger import setup_logger
+from ..metrics import REQUEST_SECONDS, StageTimer, render_gauge, render_histograms, render_stats
+from ..rag.backend_pool import BackendPool, parse_urls
 from ..rag.llm_client import LLMClient
+from ..rag.session_memory import SessionStore
+from .admission import PRIORITIES, AdmissionController, QueueFullError
 
 logger = setup_logger("api")
 
-# Initialize LM clients
-lm_studio_client = LLMClient(
-    model_type="lmstudio",
-    model_name="llama-3.2-3b-instruct",
-    api_key=settings.OPENAI_API_KEY  # Make sure to pass the API key
+# LM clients are built by the lifespan hook, not at import time, so the
+# server binds its port immediately while Chroma and indexing catch up
+clients: Dict[str, LLMClient] = {}
+startup: Dict[str, Any] = {"state": "starting", "error": None}
+
+# Both clients embed (and the local one generates) through the same server pool
+backend_pool = BackendPool(
+    parse_urls(settings.LM_STUDIO_URLS, settings.LM_STUDIO_URL),
+    max_failures=settings.BACKEND_EJECT_AFTER_FAILURES,
+    eject_seconds=settings.BACKEND_EJECT_SECONDS
 )
 
-# Only initialize OpenAI client if API key is valid
-openai_client = None
-if settings.OPENAI_API_KEY and settings.OPENAI_API_KEY != "your_openai_key_here":
-    openai_client = LLMClient(
-        model_type="openai",
-        model_name="gpt-4",
-        api_key=settings.OPENAI_API_KEY
+def openai_configured() -> bool:
+    return bool(settings.OPENAI_API_KEY and settings.OPENAI_API_KEY != "your_openai_key_here")
+
+# "updating" means an existing index answers questions while it is re-indexed,
+# "stale" that it keeps answering after re-indexing failed (see startup["error"])
+SERVING_STATES = ("ready", "updating", "stale")
+
+def serving() -> bool:
+    return startup["state"] in SERVING_STATES
+
+async def open_openai_client():
+    """Open the OpenAI client on the collection as it is now, if an API key is set"""
+    if openai_configured():
+        clients["openai"] = await asyncio.to_thread(
+            LLMClient,
+            model_type="openai",
+            model_name="gpt-4",
+            api_key=settings.OPENAI_API_KEY,
+            backend_pool=backend_pool,
+            auto_index=False
+        )
+
+async def initialize_clients():
+    """Connect to the vector store and bring the index up to date in the background.
+
+    Only a cold start with an empty store waits for indexing; otherwise the
+    current index keeps serving while changed sources are re-indexed.
+    """
+    started = time.time()
+    try:
+        startup["state"] = "connecting"
+        lm_studio_client = await asyncio.to_thread(
+            LLMClient,
+            model_type="lmstudio",
+            model_name="llama-3.2-3b-instruct",
+            api_key=settings.OPENAI_API_KEY,  # Make sure to pass the API key
+            backend_pool=backend_pool,
+            auto_index=False
+        )
+        clients["lmstudio"] = lm_studio_client
+        
+        if lm_studio_client.vector_store.count() > 0:
+            await open_openai_client()
+            startup["state"] = "updating"
+        else:
+            startup["state"] = "indexing"
+        await asyncio.to_thread(lm_studio_client.ensure_index)
+        
+        # The OpenAI client shares the collection; reopen it so an in-process
+        # store or lexical index it loaded earlier picks up the new chunks
+        await open_openai_client()
+        
+        startup["state"] = "ready"
+        logger.info(f"Clients ready after {time.time() - started:.1f}s")
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        startup["state"] = "stale" if startup["state"] == "updating" else "failed"
+        startup["error"] = str(e)
+        logger.error(f"Client initialization failed: {str(e)}")
+        logger.exception("Detailed error trace:")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_task = asyncio.create_task(initialize_clients())
+    yield
+    # Let a running ingestion stop at its next checkpoint, then close pools
+    for client in clients.values():
+        client.stop_indexing()
+    init_task.cancel()
+    try:
+        await init_task
+    except asyncio.CancelledError:
+        pass
+    for client in clients.values():
+        await client.aclose()
+
+# One admission queue per backend so a busy local model can't starve OpenAI
+# requests; local capacity grows with the number of pooled servers
+admission = {
+    "lmstudio": AdmissionController(
+        "lmstudio",
+        settings.LMSTUDIO_MAX_CONCURRENCY * len(backend_pool),
+        settings.LMSTUDIO_MAX_QUEUE * len(backend_pool),
+        settings.ADMISSION_QUEUE_TIMEOUT
+    ),
+    "openai": AdmissionController(
+        "openai",
+        settings.OPENAI_MAX_CONCURRENCY,
+        settings.OPENAI_MAX_QUEUE,
+        settings.ADMISSION_QUEUE_TIMEOUT
     )
+}
+
+# Conversation memory for requests that carry a session_id
+sessions = SessionStore(
+    recent_token_budget=settings.SESSION_RECENT_TOKEN_BUDGET,
+    summary_token_budget=settings.SESSION_SUMMARY_TOKEN_BUDGET,
+    max_sessions=settings.SESSION_MAX_SESSIONS,
+    ttl_seconds=settings.SESSION_TTL_SECONDS
+)
 
 # Set up FastAPI app
 limiter = Limiter(key_func=get_remote_address)
-app = FastAPI(title="Uganda Clinical Guidelines Chatbot")
+app = FastAPI(title="Uganda Clinical Guidelines Chatbot", lifespan=lifespan)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+@app.exception_handler(QueueFullError)
+async def queue_full_handler(request: Request, exc: QueueFullError) -> JSONResponse:
+    """Tell clients the backend is saturated and when to come back"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 # Set up static files and templates
 BASE_DIR = Path(__file__).resolve().parent
 STATIC_DIR = BASE_DIR / "static"
@@ -54,6 +168,8 @@ class Query(BaseModel):
     question: str
     model: str = "lmstudio"
     temperature: Optional[float] = 0.3
+    priority: str = "normal"
+    session_id: Optional[str] = None
     
     @validator('question')
     def validate_question(cls, v):
@@ -68,6 +184,41 @@ class Query(BaseModel):
         if v < 0 or v > 1:
             raise ValueError('Temperature must be between 0 and 1')
         return v
+    
+    @validator('priority')
+    def validate_priority(cls, v):
+        if v not in PRIORITIES:
+            raise ValueError(f"Priority must be one of {', '.join(PRIORITIES)}")
+        return v
+    
+    @validator('session_id')
+    def validate_session_id(cls, v):
+        if v is not None and not 0 < len(v) <= 128:
+            raise ValueError('Session ID must be 1-128 characters')
+        return v
+
+class BatchQuery(BaseModel):
+    questions: List[str]
+    model: str = "lmstudio"
+    temperature: Optional[float] = 0.3
+    priority: str = "normal"
+    stream: bool = False
+    
+    @validator('questions')
+    def validate_questions(cls, v):
+        if not v:
+            raise ValueError('At least one question is required')
+        if len(v) > settings.BATCH_MAX_QUESTIONS:
+            raise ValueError(f'Too many questions (maximum {settings.BATCH_MAX_QUESTIONS})')
+        return [Query.validate_question(question) for question in v]
+    
+    @validator('temperature')
+    def validate_temperature(cls, v):
+        return Query.validate_temperature(v)
+    
+    @validator('priority')
+    def validate_priority(cls, v):
+        return Query.validate_priority(v)
 
 def create_template():
     """Create the HTML template with model selection"""
@@ -237,22 +388,95 @@ def create_template():
 # Create template on startup
 create_template()
 
+def readiness() -> Dict[str, Any]:
+    """Startup state plus indexing progress of the local client"""
+    status = dict(startup)
+    if "lmstudio" in clients:
+        status["indexing"] = dict(clients["lmstudio"].index_progress)
+    return status
+
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: 200 once questions can be answered, including while an
+    existing index is being updated"""
+    status = readiness()
+    if status["state"] not in SERVING_STATES:
+        return JSONResponse(status_code=503, content=status, headers={"Retry-After": "5"})
+    return status
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
+    status = readiness()
     return {
-        "status": "healthy",
+        "status": "healthy" if status["state"] in SERVING_STATES else status["state"],
+        "startup": status,
         "models": {
-            "lmstudio": "available",
-            "openai": "available" if openai_client else "not configured"
-        }
+            "lmstudio": "available" if "lmstudio" in clients else "starting",
+            "openai": "available" if "openai" in clients else ("starting" if openai_configured() else "not configured")
+        },
+        "admission": {name: controller.stats() for name, controller in admission.items()},
+        "backends": backend_pool.stats()
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics: stage latency histograms plus cache, queue and backend gauges"""
+    lines = render_histograms()
+    lines += render_stats("rag_admission", "backend", {name: c.stats() for name, c in admission.items()})
+    lines += render_stats("rag_backend", "url", backend_pool.stats())
+    lines += render_stats("rag_sessions", "store", {"memory": sessions.stats()})
+    lines += render_stats(
+        "rag_answer_cache", "model",
+        {name: client.answer_cache.stats() for name, client in clients.items() if client.answer_cache is not None}
+    )
+    if "lmstudio" in clients:
+        client = clients["lmstudio"]
+        lines += render_stats("rag_query_embedding_memo", "model", {client.embedding_model: client.embedding_memo.stats()})
+        if client.embedding_cache is not None:
+            lines += render_stats("rag_embedding_cache", "model", {client.embedding_model: client.embedding_cache.stats()})
+        if client.embedding_batcher is not None:
+            lines += render_stats("rag_embedding_batcher", "model", {client.embedding_model: client.embedding_batcher.stats()})
+        lines += render_stats("rag_indexing", "collection", {"medical_guidelines_nomic": client.index_progress})
+    lines += render_gauge("rag_ready", "1 once questions can be answered (the index may still be updating)", [({}, serving())])
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """Serve the main chat interface"""
     return templates.TemplateResponse("index.html", {"request": request})
 
+def select_admission(model: str) -> AdmissionController:
+    """Return the admission queue guarding the requested model's backend"""
+    return admission["openai" if model == "openai" else "lmstudio"]
+
+def summarizer(model: str):
+    """Summarize a session's older turns with its own model, behind live requests"""
+    async def summarize(summary: str, turns: str) -> str:
+        async with select_admission(model).slot("low"):
+            return await select_client(model).asummarize(summary, turns, settings.SESSION_SUMMARY_TOKEN_BUDGET)
+    return summarize
+
+def select_client(model: str) -> LLMClient:
+    """Return the client for the requested model"""
+    if model == "openai" and not openai_configured():
+        raise HTTPException(
+            status_code=400,
+            detail="OpenAI API key not configured"
+        )
+    if not serving():
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service not ready ({startup['state']})",
+            headers={"Retry-After": "5"}
+        )
+    return clients["openai" if model == "openai" else "lmstudio"]
+
 @app.post("/chat")
 @limiter.limit("5/minute")
 async def chat(query: Query, request: Request) -> Dict[str, Any]:
@@ -261,24 +485,23 @@ async def chat(query: Query, request: Request) -> Dict[str, Any]:
         start_time = time.time()
         
         # Select appropriate client
-        if query.model == "openai":
-            if not openai_client:
-                raise HTTPException(
-                    status_code=400,
-                    detail="OpenAI API key not configured"
-                )
-            client = openai_client
-        else:
-            client = lm_studio_client
+        client = select_client(query.model)
         
-        # Get response
-        response = client.query(
-            question=query.question,
-            temperature=query.temperature
-        )
+        # Wait for a backend slot, then answer without blocking the event loop
+        history = sessions.history(query.session_id) if query.session_id else None
+        async with select_admission(query.model).slot(query.priority) as queue_seconds:
+            response = await client.aquery(
+                question=query.question,
+                chat_history=history,
+                temperature=query.temperature
+            )
+        if query.session_id:
+            sessions.append(query.session_id, query.question, response['response'], summarizer(query.model))
         
         # Add latency to metadata
         response['metadata']['latency'] = round(time.time() - start_time, 2)
+        response['metadata'].setdefault('timings', {})['queue_ms'] = round(queue_seconds * 1000, 1)
+        REQUEST_SECONDS.observe(time.time() - start_time, endpoint="/chat", model=query.model)
         
         logger.info(
             f"Chat response generated",
@@ -291,6 +514,8 @@ async def chat(query: Query, request: Request) -> Dict[str, Any]:
         
         return response
         
+    except (HTTPException, QueueFullError):
+        raise
     except Exception as e:
         logger.error(f"Chat failed: {str(e)}")
         raise HTTPException(
@@ -298,6 +523,165 @@ async def chat(query: Query, request: Request) -> Dict[str, Any]:
             detail=str(e)
         )
 
+@app.post("/chat/stream")
+@limiter.limit("5/minute")
+async def chat_stream(query: Query, request: Request) -> StreamingResponse:
+    """Stream chat responses as Server-Sent Events.
+
+    Sends a ``metadata`` event with the retrieved context first, then ``token``
+    events as the model generates, then ``done`` (or ``error``).
+    """
+    client = select_client(query.model)
+    controller = select_admission(query.model)
+    # Reject up front so a saturated backend still gets a plain 503
+    controller.check_capacity()
+    
+    async def event_stream():
+        start_time = time.time()
+        parts = []
+        try:
+            # The slot is held until the last token has been sent
+            history = sessions.history(query.session_id) if query.session_id else None
+            async with controller.slot(query.priority) as queue_seconds:
+                async for event in client.astream_query(
+                    question=query.question,
+                    chat_history=history,
+                    temperature=query.temperature
+                ):
+                    if event["event"] == "token":
+                        parts.append(event["data"]["content"])
+                    elif event["event"] == "done":
+                        if query.session_id:
+                            sessions.append(query.session_id, query.question, "".join(parts), summarizer(query.model))
+                        event["data"]["latency"] = round(time.time() - start_time, 2)
+                        event["data"].setdefault("timings", {})["queue_ms"] = round(queue_seconds * 1000, 1)
+                        REQUEST_SECONDS.observe(time.time() - start_time, endpoint="/chat/stream", model=query.model)
+                        logger.info(
+                            f"Chat stream completed",
+                            extra={
+                                "model": query.model,
+                                "temperature": query.temperature,
+                                "latency": event["data"]["latency"]
+                            }
+                        )
+                    yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+        except QueueFullError as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e), 'retry_after': e.retry_after})}\n\n"
+        except Exception as e:
+            logger.error(f"Chat stream failed: {str(e)}")
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def answer_batch(
+    client: LLMClient,
+    controller: AdmissionController,
+    batch: BatchQuery,
+    timer: StageTimer
+) -> AsyncIterator[Dict[str, Any]]:
+    """Answer a batch of questions, yielding each result as it finishes.
+
+    All questions are embedded in one request and retrieved with one vector
+    store query; generations then run BATCH_MAX_CONCURRENCY at a time, each
+    through the model's admission queue like a single /chat request.
+    """
+    with timer.stage("embed"):
+        embeddings = await client.aget_embeddings_batch(batch.questions)
+    with timer.stage("retrieve"):
+        contexts = await client.aretrieve_contexts(batch.questions, embeddings)
+    
+    semaphore = asyncio.Semaphore(max(1, settings.BATCH_MAX_CONCURRENCY))
+    
+    async def answer(index: int) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"index": index, "question": batch.questions[index]}
+        async with semaphore:
+            try:
+                async with controller.slot(batch.priority) as queue_seconds:
+                    response = await client.agenerate(
+                        batch.questions[index],
+                        contexts[index],
+                        temperature=batch.temperature,
+                        embedding=embeddings[index]
+                    )
+                response['metadata'].setdefault('timings', {})['queue_ms'] = round(queue_seconds * 1000, 1)
+                result.update(response)
+            except QueueFullError as e:
+                result.update({"error": str(e), "retry_after": e.retry_after})
+            except Exception as e:
+                logger.error(f"Batch question {index} failed: {str(e)}")
+                result["error"] = str(e)
+        return result
+    
+    tasks = [asyncio.create_task(answer(index)) for index in range(len(batch.questions))]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        # A disconnected stream must not leave generations holding slots
+        for task in tasks:
+            task.cancel()
+
+@app.post("/chat/batch")
+@limiter.limit("5/minute")
+async def chat_batch(batch: BatchQuery, request: Request):
+    """Answer many questions in one request.
+
+    Returns ``{"results": [...], "metadata": {...}}`` with results in question
+    order, or with ``stream`` set, NDJSON lines in completion order (each
+    carrying its ``index``) followed by a ``{"done": true, ...}`` line. A
+    failed question gets an ``error`` instead of a ``response``.
+    """
+    client = select_client(batch.model)
+    controller = select_admission(batch.model)
+    controller.check_capacity()
+    start_time = time.time()
+    timer = StageTimer("batch")
+    
+    def summary(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        latency = time.time() - start_time
+        REQUEST_SECONDS.observe(latency, endpoint="/chat/batch", model=batch.model)
+        logger.info(
+            f"Batch of {len(batch.questions)} questions answered",
+            extra={"model": batch.model, "temperature": batch.temperature, "latency": round(latency, 2)}
+        )
+        return {
+            "model": batch.model,
+            "questions": len(batch.questions),
+            "failed": sum(1 for result in results if "error" in result),
+            "latency": round(latency, 2),
+            "timings": timer.as_metadata()
+        }
+    
+    if not batch.stream:
+        try:
+            results = [result async for result in answer_batch(client, controller, batch, timer)]
+        except Exception as e:
+            logger.error(f"Batch failed: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+        results.sort(key=lambda result: result["index"])
+        return {"results": results, "metadata": summary(results)}
+    
+    async def ndjson_stream():
+        results = []
+        try:
+            async for result in answer_batch(client, controller, batch, timer):
+                results.append(result)
+                yield json.dumps(result) + "\n"
+            yield json.dumps({"done": True, **summary(results)}) + "\n"
+        except Exception as e:
+            logger.error(f"Batch stream failed: {str(e)}")
+            yield json.dumps({"done": True, "error": str(e)}) + "\n"
+    
+    return StreamingResponse(
+        ndjson_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
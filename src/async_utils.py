@@ -0,0 +1,22 @@
+# src/async_utils.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, TypeVar
+
+T = TypeVar("T")
+
+
+def run_sync(coroutine: Awaitable[T]) -> T:
+    """Run a coroutine to completion from synchronous code.
+
+    Uses asyncio.run when no event loop is running. Inside a running loop
+    (Jupyter, or a sync call made from async code) asyncio.run would raise,
+    so the coroutine gets its own loop in a worker thread and this call blocks
+    until it finishes; async callers should await the coroutine instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
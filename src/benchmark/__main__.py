@@ -0,0 +1,98 @@
+# src/benchmark/__main__.py
+"""Run a benchmark and write its results as JSON.
+
+Usage:
+    python -m src.benchmark chat --concurrency 1 4 16 --requests 100
+    python -m src.benchmark chat --stream --url http://localhost:8000
+    python -m src.benchmark ingest --files 100 --workers 4
+    python -m src.benchmark retrieval --sizes 1000 10000 100000
+    python -m src.benchmark recall --chunk-tokens 125 250 500 --overlap-tokens 0 50 --k 2 4 8
+"""
+import argparse
+import os
+
+from src.benchmark.common import write_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Uganda Clinical Guidelines chatbot benchmarks")
+    parser.add_argument("--output", help="JSON results file (default results/benchmarks/<kind>_<time>.json)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    chat = commands.add_parser("chat", help="/chat throughput and latency percentiles")
+    chat.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    chat.add_argument("--requests", type=int, default=50, help="Requests per concurrency level")
+    chat.add_argument("--stream", action="store_true", help="Use /chat/stream and report time to first token")
+    chat.add_argument("--url", help="Benchmark a running server instead of the app in-process")
+    chat.add_argument("--answer-cache", action="store_true", help="Leave the semantic answer cache on")
+    chat.add_argument("--first-token-latency", type=float, default=0.2)
+    chat.add_argument("--token-latency", type=float, default=0.02)
+    chat.add_argument("--completion-tokens", type=int, default=50)
+
+    ingest = commands.add_parser("ingest", help="Ingestion throughput")
+    ingest.add_argument("--path", help="Guideline file or directory (default: a synthetic corpus)")
+    ingest.add_argument("--files", type=int, default=50, help="Synthetic corpus size")
+    ingest.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ingest.add_argument("--embed-workers", type=int, default=4)
+    ingest.add_argument("--embed-batch-size", type=int, default=64)
+    ingest.add_argument("--embed-latency", type=float, default=0.005)
+
+    retrieval = commands.add_parser("retrieval", help="Retrieval latency versus corpus size")
+    retrieval.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    retrieval.add_argument("--queries", type=int, default=100)
+
+    recall = commands.add_parser("recall", help="Recall@k, MRR and prompt cost over chunking and k settings")
+    recall.add_argument("--path", default="data/raw/combined_text.txt", help="Guideline file or directory")
+    recall.add_argument("--questions", default="data/benchmark/retrieval_questions.json", help="Labelled question set")
+    recall.add_argument("--chunk-tokens", type=int, nargs="+", default=[125, 250, 500])
+    recall.add_argument("--overlap-tokens", type=int, nargs="+", default=[0, 50])
+    recall.add_argument("--k", type=int, nargs="+", default=[2, 4, 6, 8])
+    recall.add_argument("--embed-url", help="Embed with this LM Studio server instead of the offline hash embedder")
+    recall.add_argument("--embedding-cache-dir", help="Cache for real embeddings (default data/embedding_cache)")
+    recall.add_argument("--min-recall", type=float, default=0.9, help="Recall target for the recommended setting")
+
+    args = parser.parse_args()
+    if args.command == "chat":
+        from src.benchmark import chat as benchmark
+        results = benchmark.run(
+            args.concurrency,
+            requests_per_level=args.requests,
+            stream=args.stream,
+            url=args.url,
+            answer_cache=args.answer_cache,
+            first_token_latency=args.first_token_latency,
+            token_latency=args.token_latency,
+            completion_tokens=args.completion_tokens
+        )
+    elif args.command == "ingest":
+        from src.benchmark import ingestion as benchmark
+        results = benchmark.run(
+            path=args.path,
+            files=args.files,
+            workers=args.workers,
+            embed_workers=args.embed_workers,
+            embed_batch_size=args.embed_batch_size,
+            embed_latency=args.embed_latency
+        )
+    elif args.command == "retrieval":
+        from src.benchmark import retrieval as benchmark
+        results = benchmark.run(args.sizes, queries=args.queries)
+    else:
+        from src.benchmark import recall as benchmark
+        results = benchmark.run(
+            args.path,
+            args.chunk_tokens,
+            args.overlap_tokens,
+            args.k,
+            questions_path=args.questions,
+            embed_url=args.embed_url,
+            embedding_cache_dir=args.embedding_cache_dir,
+            min_recall=args.min_recall
+        )
+
+    path = write_results(args.command, results, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
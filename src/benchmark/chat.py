@@ -0,0 +1,168 @@
+# src/benchmark/chat.py
+"""/chat throughput and latency at increasing concurrency"""
+import asyncio
+import json
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+import uvicorn
+
+from src.benchmark.common import configure_environment, percentiles
+from src.benchmark.corpus import QUESTIONS, write_corpus
+from src.benchmark.fake_server import FakeLLMServer
+
+
+def question(index: int) -> str:
+    # Vary the wording so requests don't all collapse onto one cache entry
+    return f"{QUESTIONS[index % len(QUESTIONS)]} (case {index})"
+
+
+async def timed_request(client: httpx.AsyncClient, index: int, stream: bool) -> Dict[str, Any]:
+    payload = {"question": question(index), "model": "lmstudio"}
+    start_time = time.perf_counter()
+    if not stream:
+        response = await client.post("/chat", json=payload)
+        return {"status": response.status_code, "latency": time.perf_counter() - start_time}
+
+    first_token = None
+    async with client.stream("POST", "/chat/stream", json=payload) as response:
+        status = response.status_code
+        async for line in response.aiter_lines():
+            if line.startswith("event: token") and first_token is None:
+                first_token = time.perf_counter() - start_time
+            elif line.startswith("event: error"):
+                status = 500
+    return {"status": status, "latency": time.perf_counter() - start_time, "ttft": first_token}
+
+
+async def measure_level(client: httpx.AsyncClient, concurrency: int, num_requests: int, stream: bool) -> Dict[str, Any]:
+    """Closed loop: concurrency workers each send requests back to back"""
+    results: List[Dict[str, Any]] = []
+    counter = iter(range(num_requests))
+
+    async def worker():
+        for index in counter:
+            try:
+                results.append(await timed_request(client, index, stream))
+            except httpx.HTTPError as e:
+                results.append({"status": type(e).__name__, "latency": None})
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start_time
+
+    ok = [r for r in results if r["status"] == 200]
+    level = {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "ok": len(ok),
+        "rejected": sum(1 for r in results if r["status"] == 503),
+        "errors": sum(1 for r in results if r["status"] not in (200, 503)),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed > 0 else None,
+        "latency": percentiles([r["latency"] for r in ok])
+    }
+    if stream:
+        level["time_to_first_token"] = percentiles([r["ttft"] for r in ok if r.get("ttft") is not None])
+    return level
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 600.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = await client.get("/health/ready")
+        if response.status_code == 200:
+            return
+        await asyncio.sleep(0.2)
+    raise TimeoutError("Service did not become ready")
+
+
+async def run_levels(
+    client: httpx.AsyncClient,
+    concurrency_levels: List[int],
+    requests_per_level: int,
+    stream: bool
+) -> List[Dict[str, Any]]:
+    await wait_until_ready(client)
+    levels = []
+    for concurrency in concurrency_levels:
+        level = await measure_level(client, concurrency, max(requests_per_level, concurrency), stream)
+        print(json.dumps(level))
+        levels.append(level)
+    return levels
+
+
+def run(
+    concurrency_levels: List[int],
+    requests_per_level: int = 50,
+    stream: bool = False,
+    url: Optional[str] = None,
+    answer_cache: bool = False,
+    first_token_latency: float = 0.2,
+    token_latency: float = 0.02,
+    completion_tokens: int = 50,
+    corpus_files: int = 10
+) -> Dict[str, Any]:
+    """Benchmark a running server at url, or a local one against the fake LLM.
+
+    Local runs serve the app with uvicorn on a free port, index a small
+    synthetic corpus into a throwaway numpy store and switch off the per-IP
+    rate limit. Against a real server the ``5/minute`` limit still applies,
+    so run it with the limiter disabled.
+    """
+    config = {
+        "concurrency_levels": concurrency_levels,
+        "requests_per_level": requests_per_level,
+        "stream": stream,
+        "target": url or "local"
+    }
+
+    async def measure(base_url: str):
+        async with httpx.AsyncClient(base_url=base_url, timeout=300) as client:
+            levels = await run_levels(client, concurrency_levels, requests_per_level, stream)
+            health = (await client.get("/health")).json()
+        return levels, health.get("admission")
+
+    if url:
+        levels, admission = asyncio.run(measure(url))
+        return {"config": config, "levels": levels, "admission": admission}
+
+    config.update({
+        "answer_cache": answer_cache,
+        "first_token_latency": first_token_latency,
+        "token_latency": token_latency,
+        "completion_tokens": completion_tokens
+    })
+    with tempfile.TemporaryDirectory() as workdir, FakeLLMServer(
+        first_token_latency=first_token_latency,
+        token_latency=token_latency,
+        completion_tokens=completion_tokens
+    ) as server:
+        corpus = write_corpus(str(Path(workdir) / "corpus"), files=corpus_files)
+        configure_environment(
+            workdir, server.url,
+            DATA_PATH=corpus.as_posix(),
+            ANSWER_CACHE_ENABLED=answer_cache
+        )
+        from src.api import main as api
+
+        api.limiter.enabled = False
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        app_server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning"))
+        thread = threading.Thread(target=app_server.run, daemon=True)
+        thread.start()
+        try:
+            while not app_server.started:
+                time.sleep(0.05)
+            levels, admission = asyncio.run(measure(f"http://127.0.0.1:{port}"))
+        finally:
+            app_server.should_exit = True
+            thread.join()
+        return {"config": config, "levels": levels, "admission": admission, "fake_server": server.counts}
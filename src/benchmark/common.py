@@ -0,0 +1,95 @@
+# src/benchmark/common.py
+"""Helpers shared by the benchmark drivers"""
+import hashlib
+import json
+import os
+import platform
+import re
+import subprocess
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+RESULTS_DIR = Path("results/benchmarks")
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def hash_embedding(text: str, dim: int = 256) -> List[float]:
+    """Deterministic bag-of-words embedding for offline runs.
+
+    Each lowercased word is hashed to a signed bucket, so texts sharing words
+    get a high cosine similarity and no model or network call is needed.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in WORD_PATTERN.findall(text.lower()):
+        digest = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+        vector[digest % dim] += 1.0 if (digest >> 32) & 1 else -1.0
+    vector = np.sign(vector) * np.log1p(np.abs(vector))
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        vector[0] = norm = 1.0
+    return (vector / norm).tolist()
+
+
+def percentiles(seconds: Sequence[float]) -> Dict[str, Any]:
+    """Count, mean and p50/p95/p99 of latencies, in milliseconds"""
+    if not len(seconds):
+        return {"count": 0}
+    values = np.asarray(seconds) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": len(values),
+        "mean_ms": round(float(values.mean()), 2),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2)
+    }
+
+
+def configure_environment(workdir: str, llm_url: str, **overrides: Any):
+    """Point settings at throwaway stores and a fake LLM server.
+
+    Must run before anything under src imports src.config, since settings
+    are read once at import time.
+    """
+    workdir = Path(workdir)
+    env = {
+        "OPENAI_API_KEY": "",
+        "LM_STUDIO_URL": llm_url,
+        "LM_STUDIO_URLS": "",
+        "VECTOR_STORE_BACKEND": "numpy",
+        "VECTOR_STORE_DIR": str(workdir / "vector_store"),
+        "LEXICAL_INDEX_DIR": str(workdir / "lexical_index"),
+        "INDEX_MANIFEST_PATH": str(workdir / "index_manifest.json"),
+        "EMBEDDING_CACHE_DIR": str(workdir / "embedding_cache")
+    }
+    env.update({key: str(value) for key, value in overrides.items()})
+    os.environ.update(env)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(kind: str, results: Dict[str, Any], output: Optional[str] = None) -> Path:
+    """Write results as JSON, tagged with the commit so runs can be compared"""
+    report = {
+        "benchmark": kind,
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        **results
+    }
+    path = Path(output) if output else RESULTS_DIR / f"{kind}_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2))
+    return path
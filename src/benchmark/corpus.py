@@ -0,0 +1,74 @@
+# src/benchmark/corpus.py
+"""Synthetic guideline-like text for benchmarks"""
+import re
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+DEFAULT_VOCABULARY_SOURCE = "data/raw/combined_text.txt"
+FALLBACK_VOCABULARY = (
+    "malaria fever treatment dose child adult artemether lumefantrine tablets daily "
+    "hypertension blood pressure diabetes insulin glucose tuberculosis cough sputum "
+    "referral hospital pregnancy anaemia iron folic acid infection antibiotic "
+    "amoxicillin weight kg mg oral intravenous diagnosis signs symptoms management "
+    "prevention counselling hiv art viral load severe mild moderate monitor"
+).split()
+
+QUESTIONS = [
+    "What is the first-line treatment for uncomplicated malaria in adults?",
+    "How should severe malaria be managed in children?",
+    "What is the recommended dose of amoxicillin for pneumonia in children?",
+    "How is hypertension diagnosed and treated?",
+    "What are the danger signs in pregnancy that need referral?",
+    "How should iron deficiency anaemia be treated?",
+    "What is the treatment regimen for drug-sensitive tuberculosis?",
+    "How should diabetic ketoacidosis be managed?",
+    "When should antiretroviral therapy be started in HIV?",
+    "How is dehydration from diarrhoea managed in children?",
+    "What are the signs of meningitis and how is it treated?",
+    "How should a snake bite be managed?"
+]
+
+
+def vocabulary(source: Optional[str] = DEFAULT_VOCABULARY_SOURCE, size: int = 5000) -> List[str]:
+    """The most frequent words of the guideline text, or a small built-in list"""
+    if source and Path(source).exists():
+        words = re.findall(r"[a-z]{3,}", Path(source).read_text(encoding="utf-8").lower())
+        if words:
+            unique, counts = np.unique(words, return_counts=True)
+            return unique[np.argsort(-counts)[:size]].tolist()
+    return list(FALLBACK_VOCABULARY)
+
+
+def synthetic_paragraphs(count: int, words: List[str], rng: np.random.Generator, length: int = 60) -> List[str]:
+    """Paragraphs of words drawn with a Zipf-like frequency profile"""
+    weights = 1.0 / np.arange(1, len(words) + 1)
+    weights /= weights.sum()
+    drawn = rng.choice(len(words), size=(count, length), p=weights)
+    return [" ".join(words[i] for i in row) + "." for row in drawn]
+
+
+def write_corpus(
+    directory: str,
+    files: int = 20,
+    sections_per_file: int = 5,
+    subsections_per_section: int = 4,
+    paragraphs_per_subsection: int = 6,
+    seed: int = 0,
+    vocabulary_source: Optional[str] = DEFAULT_VOCABULARY_SOURCE
+) -> Path:
+    """Write markdown files with the ``# `` / ``## `` layout the chunker expects"""
+    rng = np.random.default_rng(seed)
+    words = vocabulary(vocabulary_source)
+    root = Path(directory)
+    root.mkdir(parents=True, exist_ok=True)
+    for f in range(files):
+        lines: List[str] = []
+        for s in range(sections_per_file):
+            lines.append(f"# {f + 1}.{s + 1} {' '.join(rng.choice(words, 3)).title()}")
+            for sub in range(subsections_per_section):
+                lines.append(f"## {f + 1}.{s + 1}.{sub + 1} {' '.join(rng.choice(words, 2)).title()}")
+                lines.extend(synthetic_paragraphs(paragraphs_per_subsection, words, rng))
+        (root / f"guideline_{f:04d}.md").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return root
@@ -0,0 +1,190 @@
+# src/benchmark/fake_server.py
+"""OpenAI-compatible stand-in for LM Studio with configurable latency.
+
+Usage:
+    python -m src.benchmark.fake_server --port 1234 --first-token-latency 0.3
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+from src.benchmark.common import hash_embedding
+
+
+class FakeLLMServer:
+    """Serve /v1/embeddings and /v1/chat/completions from a background thread.
+
+    Embeddings come from :func:`hash_embedding`, so they are deterministic and
+    similar texts stay similar. A completion takes ``first_token_latency``
+    plus ``token_latency`` per generated token, and ``"stream": true``
+    requests get the tokens as Server-Sent Events at that pace.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        embedding_dim: int = 256,
+        embed_latency: float = 0.005,
+        embed_latency_per_input: float = 0.0005,
+        first_token_latency: float = 0.2,
+        token_latency: float = 0.02,
+        completion_tokens: int = 50
+    ):
+        self.embedding_dim = embedding_dim
+        self.embed_latency = embed_latency
+        self.embed_latency_per_input = embed_latency_per_input
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.completion_tokens = completion_tokens
+        self.counts = {"embedding_requests": 0, "embedded_inputs": 0, "completions": 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve in the calling thread until interrupted"""
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self.counts[key] += amount
+
+    def _embeddings(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        inputs = body.get("input", [])
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        self._count("embedding_requests")
+        self._count("embedded_inputs", len(inputs))
+        time.sleep(self.embed_latency + self.embed_latency_per_input * len(inputs))
+        return {
+            "object": "list",
+            "model": body.get("model"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": hash_embedding(text, self.embedding_dim)}
+                for i, text in enumerate(inputs)
+            ]
+        }
+
+    def _tokens(self, body: Dict[str, Any]):
+        num_tokens = min(self.completion_tokens, body.get("max_tokens") or self.completion_tokens)
+        return [f"token{i} " for i in range(num_tokens)]
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, payload: Dict[str, Any], status: int = 200):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_chunk(self, text: str):
+                data = text.encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_GET(self):
+                if self.path.rstrip("/") == "/v1/models":
+                    self._send_json({"object": "list", "data": [{"id": "fake-model", "object": "model"}]})
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if self.path.rstrip("/") == "/v1/embeddings":
+                    self._send_json(server._embeddings(body))
+                elif self.path.rstrip("/") == "/v1/chat/completions":
+                    self._complete(body)
+                else:
+                    self._send_json({"error": "not found"}, 404)
+
+            def _complete(self, body: Dict[str, Any]):
+                server._count("completions")
+                tokens = server._tokens(body)
+                time.sleep(server.first_token_latency)
+                if not body.get("stream"):
+                    time.sleep(server.token_latency * max(0, len(tokens) - 1))
+                    self._send_json({
+                        "object": "chat.completion",
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+                        "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens)}
+                    })
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i, token in enumerate(tokens):
+                    if i:
+                        time.sleep(server.token_latency)
+                    chunk = {"object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {"content": token}}]}
+                    self._send_chunk(f"data: {json.dumps(chunk)}\n\n")
+                self._send_chunk("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible LLM server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1234)
+    parser.add_argument("--embedding-dim", type=int, default=256)
+    parser.add_argument("--embed-latency", type=float, default=0.005, help="Seconds per embeddings request")
+    parser.add_argument("--first-token-latency", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="Seconds per further token")
+    parser.add_argument("--completion-tokens", type=int, default=50)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(
+        host=args.host,
+        port=args.port,
+        embedding_dim=args.embedding_dim,
+        embed_latency=args.embed_latency,
+        first_token_latency=args.first_token_latency,
+        token_latency=args.token_latency,
+        completion_tokens=args.completion_tokens
+    )
+    print(f"Fake LLM server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# src/benchmark/ingestion.py
+"""Ingestion throughput of the standalone indexing job against the fake LLM"""
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from src.benchmark.common import configure_environment
+from src.benchmark.corpus import write_corpus
+from src.benchmark.fake_server import FakeLLMServer
+
+
+def run(
+    path: Optional[str] = None,
+    files: int = 50,
+    workers: int = os.cpu_count() or 1,
+    embed_workers: int = 4,
+    embed_batch_size: int = 64,
+    embed_latency: float = 0.005
+) -> Dict[str, Any]:
+    """Index path (or a synthetic corpus of files) into a throwaway numpy store.
+
+    The embedding cache is disabled so every chunk really goes through the
+    embeddings endpoint.
+    """
+    with tempfile.TemporaryDirectory() as workdir, FakeLLMServer(embed_latency=embed_latency) as server:
+        corpus = Path(path) if path else write_corpus(str(Path(workdir) / "corpus"), files=files)
+        configure_environment(workdir, server.url, DATA_PATH=corpus.as_posix(), EMBEDDING_CACHE_DIR="")
+        from src.ingest import ingest
+        from src.rag.llm_client import LLMClient
+
+        client = LLMClient(
+            model_type="lmstudio",
+            api_key=None,
+            embed_batch_size=embed_batch_size,
+            embed_max_workers=embed_workers,
+            auto_index=False
+        )
+        report = ingest(corpus.as_posix(), workers, client=client)
+        return {
+            "config": {
+                "corpus": path or f"synthetic ({files} files)",
+                "workers": workers,
+                "embed_workers": embed_workers,
+                "embed_batch_size": embed_batch_size,
+                "embed_latency": embed_latency
+            },
+            "results": report,
+            "fake_server": server.counts
+        }
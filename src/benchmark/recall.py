@@ -0,0 +1,138 @@
+# src/benchmark/recall.py
+"""Retrieval quality versus cost over a grid of chunking and k settings"""
+import itertools
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from src.benchmark.common import configure_environment, percentiles
+from src.benchmark.fake_server import FakeLLMServer
+
+DEFAULT_QUESTIONS = "data/benchmark/retrieval_questions.json"
+
+
+def heading(chunk: str) -> str:
+    """The section and subsection lines every chunk starts with, normalized"""
+    return " ".join(chunk.split("\n", 2)[:2]).replace("*", "").lower()
+
+
+def first_relevant_rank(chunks: List[str], labels: List[str]) -> Optional[int]:
+    """1-based rank of the first chunk under one of the labelled headings"""
+    for rank, chunk in enumerate(chunks, 1):
+        if any(label in heading(chunk) for label in labels):
+            return rank
+    return None
+
+
+def evaluate(client, questions: List[Dict[str, Any]], k: int) -> Dict[str, Any]:
+    """Recall@k, MRR, retrieval latency and prompt-token cost (before and after
+    context compression) for one k"""
+    from src.config import settings
+    from src.rag.compression import compress_context
+    from src.rag.context import estimate_tokens
+
+    client.n_results = k
+    client.hybrid_candidates = max(k, settings.HYBRID_CANDIDATES)
+    client.context_candidates = max(k, settings.CONTEXT_CANDIDATES)
+    hits, reciprocal_ranks, latencies, prompt_tokens, compressed_tokens, num_chunks = [], [], [], [], [], []
+    for item in questions:
+        embedding = client.get_embeddings(item["question"])
+        start_time = time.perf_counter()
+        chunks = client.retrieve_documents(item["question"], embedding)
+        latencies.append(time.perf_counter() - start_time)
+        rank = first_relevant_rank(chunks, [label.lower() for label in item["relevant"]])
+        hits.append(rank is not None)
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+        prompt_tokens.append(estimate_tokens("\n".join(chunks)) if chunks else 0)
+        compressed = compress_context(item["question"], chunks, settings.CONTEXT_COMPRESSION_TOKEN_BUDGET)
+        compressed_tokens.append(estimate_tokens(compressed) if chunks else 0)
+        num_chunks.append(len(chunks))
+    return {
+        "k": k,
+        "recall_at_k": round(float(np.mean(hits)), 4),
+        "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+        "mean_chunks": round(float(np.mean(num_chunks)), 2),
+        "mean_prompt_tokens": round(float(np.mean(prompt_tokens)), 1),
+        "mean_compressed_prompt_tokens": round(float(np.mean(compressed_tokens)), 1),
+        "latency": percentiles(latencies)
+    }
+
+
+def run(
+    path: str,
+    chunk_tokens: List[int],
+    overlap_tokens: List[int],
+    ks: List[int],
+    questions_path: str = DEFAULT_QUESTIONS,
+    embed_url: Optional[str] = None,
+    embedding_cache_dir: Optional[str] = None,
+    min_recall: float = 0.9
+) -> Dict[str, Any]:
+    """Index path once per (chunk size, overlap) and evaluate every k against it.
+
+    Without embed_url, embeddings come from the fake server's deterministic
+    hash embedder, so the run is fully offline. With embed_url (LM Studio),
+    real embeddings are cached in embedding_cache_dir (data/embedding_cache
+    by default) and later runs reuse them. Returns per-setting results and
+    the cheapest setting, by prompt tokens, whose recall reaches min_recall.
+    """
+    questions = json.loads(Path(questions_path).read_text(encoding="utf-8"))
+    runs = []
+    with tempfile.TemporaryDirectory() as workdir, FakeLLMServer(embed_latency=0.0, embed_latency_per_input=0.0) as server:
+        configure_environment(
+            workdir, embed_url or server.url,
+            EMBEDDING_CACHE_DIR=(embedding_cache_dir or "data/embedding_cache") if embed_url else ""
+        )
+        from src.rag.chunker import iter_file_chunks, iter_source_files
+        from src.rag.llm_client import LLMClient
+
+        files = list(iter_source_files(path))
+        if not files:
+            raise FileNotFoundError(f"No guideline files found at {path}")
+        for tokens, overlap in itertools.product(sorted(chunk_tokens), sorted(overlap_tokens)):
+            if overlap >= tokens:
+                continue
+            setting_dir = Path(workdir) / f"{tokens}_{overlap}"
+            client = LLMClient(
+                model_type="lmstudio",
+                api_key=None,
+                manifest_path=str(setting_dir / "manifest.json"),
+                vector_store_backend="numpy",
+                vector_store_dir=str(setting_dir / "vector_store"),
+                lexical_index_dir=str(setting_dir / "lexical_index"),
+                chunk_tokens=tokens,
+                chunk_overlap_tokens=overlap,
+                auto_index=False
+            )
+            build_start = time.perf_counter()
+            for file_path in files:
+                client.index_chunks(file_path.as_posix(), iter_file_chunks(file_path, tokens, overlap))
+            build_seconds = time.perf_counter() - build_start
+            for k in sorted(ks):
+                result = {
+                    "chunk_tokens": tokens,
+                    "overlap_tokens": overlap,
+                    "chunks": client.vector_store.count(),
+                    "index_seconds": round(build_seconds, 2),
+                    **evaluate(client, questions, k)
+                }
+                print(json.dumps(result))
+                runs.append(result)
+
+    qualifying = [r for r in runs if r["recall_at_k"] >= min_recall]
+    best = min(qualifying, key=lambda r: (r["mean_prompt_tokens"], r["latency"]["p50_ms"])) if qualifying else None
+    return {
+        "config": {
+            "path": path,
+            "questions": questions_path,
+            "num_questions": len(questions),
+            "embedder": embed_url or "hash",
+            "min_recall": min_recall
+        },
+        "results": runs,
+        "cheapest_meeting_min_recall": best
+    }
@@ -0,0 +1,87 @@
+# src/benchmark/retrieval.py
+"""Retrieval latency as the indexed corpus grows"""
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+from src.benchmark.common import configure_environment, hash_embedding, percentiles
+from src.benchmark.corpus import QUESTIONS, synthetic_paragraphs, vocabulary
+
+EMBEDDING_DIM = 256
+WRITE_BATCH = 5000
+
+
+def run(sizes: List[int], queries: int = 100, seed: int = 0) -> Dict[str, Any]:
+    """Fill a throwaway numpy store and BM25 index with synthetic chunks of each size.
+
+    Reports build time and the latency of the vector query, the BM25 query and
+    the whole retrieval path (hybrid fusion plus context selection). No LLM
+    server is needed: chunks and questions use the local hash embedder.
+    """
+    rng = np.random.default_rng(seed)
+    words = vocabulary()
+    questions = [QUESTIONS[i % len(QUESTIONS)] for i in range(queries)]
+    question_embeddings = [hash_embedding(q, EMBEDDING_DIM) for q in questions]
+
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_environment(workdir, "http://127.0.0.1:9", EMBEDDING_CACHE_DIR="")
+        from src.rag.llm_client import LLMClient
+        from src.rag.manifest import chunk_id
+
+        results = []
+        for size in sorted(sizes):
+            size_dir = Path(workdir) / str(size)
+            client = LLMClient(
+                model_type="lmstudio",
+                api_key=None,
+                embedding_cache_dir=None,
+                manifest_path=str(size_dir / "manifest.json"),
+                vector_store_backend="numpy",
+                vector_store_dir=str(size_dir / "vector_store"),
+                lexical_index_dir=str(size_dir / "lexical_index"),
+                auto_index=False
+            )
+            build_start = time.perf_counter()
+            for start in range(0, size, WRITE_BATCH):
+                texts = synthetic_paragraphs(min(WRITE_BATCH, size - start), words, rng)
+                texts = [f"# Section {start + i}\n## Topic\n{text}" for i, text in enumerate(texts)]
+                ids = [chunk_id(text) for text in texts]
+                client.vector_store.upsert(
+                    ids=ids,
+                    embeddings=[hash_embedding(text, EMBEDDING_DIM) for text in texts],
+                    documents=texts,
+                    metadatas=[{"source": "synthetic", "section": "", "subsection": ""}] * len(texts)
+                )
+                if client.lexical_index is not None:
+                    client.lexical_index.add(ids, texts)
+            if client.lexical_index is not None:
+                client.lexical_index.build()
+            build_seconds = time.perf_counter() - build_start
+
+            vector, lexical, full = [], [], []
+            for q, embedding in zip(questions, question_embeddings):
+                start_time = time.perf_counter()
+                client.vector_store.query(query_embeddings=[embedding], n_results=client._num_candidates())
+                vector.append(time.perf_counter() - start_time)
+                if client.lexical_index is not None:
+                    start_time = time.perf_counter()
+                    client.lexical_index.search(q, client.hybrid_candidates)
+                    lexical.append(time.perf_counter() - start_time)
+                start_time = time.perf_counter()
+                client._retrieve(q, embedding)
+                full.append(time.perf_counter() - start_time)
+
+            result = {
+                "chunks": client.vector_store.count(),
+                "build_seconds": round(build_seconds, 2),
+                "vector_query": percentiles(vector),
+                "lexical_query": percentiles(lexical),
+                "retrieve": percentiles(full)
+            }
+            print(result)
+            results.append(result)
+
+        return {"config": {"sizes": sizes, "queries": queries, "embedding_dim": EMBEDDING_DIM}, "results": results}
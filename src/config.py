@@ -4,11 +4,62 @@ from typing import Optional
 class Settings(BaseSettings):
     OPENAI_API_KEY: str
     LM_STUDIO_URL: str = "http://localhost:1234"
+    LM_STUDIO_URLS: str = ""  # Comma-separated pool of OpenAI-compatible servers; overrides LM_STUDIO_URL
+    BACKEND_EJECT_AFTER_FAILURES: int = 3  # Consecutive failures before a pooled server is taken out
+    BACKEND_EJECT_SECONDS: float = 30.0  # How long an ejected server sits out before a retry
     CHROMA_HOST: str = "localhost"
     CHROMA_PORT: int = 8080
-    DATA_PATH: str = "data/raw/combined_text.txt"
+    DATA_PATH: str = "data/raw/combined_text.txt"  # A guideline file or a directory of them
     RESET_COLLECTION: bool = False
     EMBEDDING_MODEL: str = "nomic-embed-text-v1.5"  # Add this line
+    CHUNK_TOKENS: int = 250  # Estimated tokens per chunk (about 1000 characters)
+    CHUNK_OVERLAP_TOKENS: int = 0  # Trailing tokens repeated at the start of the next chunk
+    EMBED_BATCH_SIZE: int = 64  # Chunks per /v1/embeddings request
+    EMBED_MAX_WORKERS: int = 4  # Parallel embedding requests during ingestion
+    EMBEDDING_CACHE_DIR: Optional[str] = "data/embedding_cache"  # Set empty to disable
+    QUERY_EMBEDDING_MEMO_BYTES: int = 16 * 1024 * 1024  # In-memory memo of question embeddings
+    QUERY_EMBED_BATCH_WINDOW_MS: float = 5.0  # Window for batching concurrent question embeddings; 0 disables
+    QUERY_EMBED_BATCH_MAX: int = 32  # Maximum questions per batched embedding request
+    INDEX_MANIFEST_PATH: str = "data/index_manifest.json"  # Indexed chunk IDs and checkpoint
+    INDEX_WRITE_BATCH_SIZE: int = 512  # Chunks embedded and upserted per checkpoint
+    VECTOR_STORE_BACKEND: str = "chroma"  # "chroma" (HTTP server), "numpy" (in-process) or "snapshot" (read-only, memory-mapped)
+    VECTOR_STORE_DIR: str = "data/vector_store"  # Where the numpy backend saves its index
+    SNAPSHOT_DIR: str = "data/snapshot"  # Where collection snapshots are exported and served from
+    SNAPSHOT_RESCORE_FACTOR: int = 4  # Int8 snapshots re-score this many times n_results candidates exactly
+    RETRIEVAL_N_RESULTS: int = 4  # Context chunks per question; tried 2, not so good
+    HYBRID_SEARCH: bool = True  # Fuse BM25 and vector rankings
+    HYBRID_CANDIDATES: int = 10  # Candidates taken from each ranking before fusion
+    RRF_K: int = 60  # Reciprocal-rank fusion constant
+    LEXICAL_INDEX_DIR: str = "data/lexical_index"
+    CONTEXT_SELECTION: bool = True  # MMR diversification and adaptive cutoff of context chunks
+    CONTEXT_CANDIDATES: int = 12  # Candidates considered by MMR
+    MMR_LAMBDA: float = 0.7  # 1.0 = pure relevance, 0.0 = pure diversity
+    CONTEXT_MAX_RELEVANCE_GAP: float = 0.5  # Drop chunks this far below the best (relative score)
+    CONTEXT_TOKEN_BUDGET: int = 1200  # Estimated prompt tokens for retrieved context
+    CONTEXT_COMPRESSION: bool = True  # Keep only the sentences of selected chunks that match the question
+    CONTEXT_COMPRESSION_TOKEN_BUDGET: int = 600  # Estimated prompt tokens after compression
+    LLM_REQUEST_TIMEOUT: float = 120.0  # Seconds, for async calls to LM Studio
+    ASYNC_HTTP_MAX_CONNECTIONS: int = 32  # Pooled connections for the async query path
+    ANSWER_CACHE_ENABLED: bool = False  # Reuse answers to near-identical questions; answers go stale when the index changes
+    ANSWER_CACHE_THRESHOLD: float = 0.95  # Minimum cosine similarity for a cache hit
+    ANSWER_CACHE_MAX_ENTRIES: int = 1000
+    ANSWER_CACHE_TTL_SECONDS: float = 86400
+    LMSTUDIO_MAX_CONCURRENCY: int = 2  # Generations in flight per local server
+    LMSTUDIO_MAX_QUEUE: int = 16  # Waiting requests per local server; beyond this /chat returns 503
+    OPENAI_MAX_CONCURRENCY: int = 8
+    OPENAI_MAX_QUEUE: int = 32
+    ADMISSION_QUEUE_TIMEOUT: float = 60.0  # Seconds a request may wait for a slot
+    SESSION_RECENT_TOKEN_BUDGET: int = 1000  # Latest turns kept verbatim per conversation
+    SESSION_SUMMARY_TOKEN_BUDGET: int = 300  # Rolling summary of older turns
+    CHAT_HISTORY_TOKEN_BUDGET: int = 1400  # Hard cap on history in any prompt (summary + recent turns)
+    SESSION_MAX_SESSIONS: int = 1000
+    SESSION_TTL_SECONDS: float = 3600  # Idle conversations are forgotten after this
+    BATCH_MAX_QUESTIONS: int = 50  # Questions accepted by one /chat/batch request
+    BATCH_MAX_CONCURRENCY: int = 4  # Generations one batch may run (and queue) at once
+    GENERATION_QUESTIONS_IN_FLIGHT: int = 16  # Questions answered at once by the batch response generator
+    EVAL_MAX_CONCURRENCY: int = 8  # Gradings in flight during evaluation
+    EVAL_REQUESTS_PER_MINUTE: float = 120  # Keep under the grader model's rate limit
+    EVAL_CHECKPOINT_PATH: str = "results/grading_checkpoint.jsonl"  # Finished gradings, reused on resume
     
     class Config:
         env_file = ".env"
@@ -1,10 +1,16 @@
+import asyncio
+import csv
 import pandas as pd
 import os
+from typing import Dict, List, Sequence
+from src.async_utils import run_sync
 from src.rag.llm_client import LLMClient
 from src.logger import setup_logger
 from openai import OpenAI
 from src.config import settings
 
+GENERATION_FAILED = "Response generation failed"
+
 class RAGResponseGenerator:
     def __init__(self, input_csv_path, output_csv_path, openai_api_key):
         """
@@ -21,7 +27,7 @@ class RAGResponseGenerator:
         self.input_df = pd.read_csv(input_csv_path)
         self.output_csv_path = output_csv_path
         output_dir = os.path.dirname(self.output_csv_path)
-        if not os.path.exists(output_dir):
+        if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir)
             self.logger.info(f"Created output directory: {output_dir}")
                 
@@ -36,71 +42,149 @@ class RAGResponseGenerator:
         self.openai_client = LLMClient(
             model_type="openai",
             model_name="gpt-4",
-            api_key=settings.OPENAI_API_KEY
+            api_key=openai_api_key
         )
+        self.clients = {"lmstudio": self.lmstudio_client, "openai": self.openai_client}
         
-    def generate_responses(self, num_runs=1):
+    def generate_responses(
+        self,
+        num_runs=1,
+        models: Sequence[str] = ("lmstudio", "openai"),
+        questions_in_flight: int = settings.GENERATION_QUESTIONS_IN_FLIGHT
+    ):
         """
-        Generate multiple responses for each question using both models
+        Generate multiple responses for each question using each model
+        
+        Context is retrieved once per question and shared by every generation
+        (both models use the same collection). Generations run concurrently,
+        limited per model by LMSTUDIO_MAX_CONCURRENCY (per server) and
+        OPENAI_MAX_CONCURRENCY, and each question's row is appended to the
+        output CSV as soon as it is complete. Questions already in the output
+        file are skipped, so an interrupted run can be restarted. Questions
+        with a failed retrieval or generation are not written, so a rerun
+        retries them. From code that already runs an event loop, await
+        agenerate_responses instead; called there, this blocks the loop while
+        generation runs in a worker thread.
         
-        :param num_runs: Number of response generations per question
+        :param num_runs: Number of response generations per question and model
+        :param models: Models to generate with; responses are numbered in this order
+        :param questions_in_flight: Questions retrieved and generated at once
         :return: DataFrame with responses
         """
-        results = []
+        return run_sync(self.agenerate_responses(num_runs, models, questions_in_flight))
+    
+    async def agenerate_responses(
+        self,
+        num_runs=1,
+        models: Sequence[str] = ("lmstudio", "openai"),
+        questions_in_flight: int = settings.GENERATION_QUESTIONS_IN_FLIGHT
+    ):
+        """Async version of generate_responses"""
+        columns = ['Questions'] + [f'response {i+1}' for i in range(num_runs * len(models))]
+        done = self._completed_questions(columns)
+        questions = [q for q in self.input_df['Questions'] if q not in done]
+        self.logger.info(f"{len(done)} questions already answered, {len(questions)} to go")
         
-        for idx, row in self.input_df.iterrows():
-            question = row['Questions']
-            self.logger.info(f"Processing question: {question}")
-            
-            # # Generate LM Studio responses
-            # lm_studio_responses = self._generate_model_responses(
-            #     self.lmstudio_client, question, num_runs
-            # )
-            
-            # Generate OpenAI responses
-            openai_responses = self._generate_model_responses(
-                self.openai_client, question, num_runs
-            )
-            
-            # Prepare result row
-            result_row = {
-                'Questions': question,
-                # **{f'response {i+1}': resp for i, resp in enumerate(lm_studio_responses)},
-                **{f'response': resp for resp in enumerate(openai_responses)}
-            }
-            
-            results.append(result_row)
+        limits = {
+            "lmstudio": settings.LMSTUDIO_MAX_CONCURRENCY * len(self.lmstudio_client.backends),
+            "openai": settings.OPENAI_MAX_CONCURRENCY
+        }
+        semaphores = {model: asyncio.Semaphore(limits[model]) for model in models}
+        question_slots = asyncio.Semaphore(max(1, questions_in_flight))
+        write_lock = asyncio.Lock()
         
-        # Convert to DataFrame
-        results_df = pd.DataFrame(results)
+        async def process(question: str):
+            async with question_slots:
+                self.logger.info(f"Processing question: {question}")
+                responses = await self._generate_question_responses(question, num_runs, models, semaphores)
+                if GENERATION_FAILED in responses:
+                    self.logger.warning(f"Not saving question with failed responses, rerun to retry: {question}")
+                    return
+                row = {'Questions': question, **{f'response {i+1}': resp for i, resp in enumerate(responses)}}
+                async with write_lock:
+                    self._append_row(columns, row)
         
-        # Save to CSV
-        results_df.to_csv(self.output_csv_path, index=False)
+        try:
+            await asyncio.gather(*(process(question) for question in questions))
+        finally:
+            for client in self.clients.values():
+                await client.aclose()
         self.logger.info(f"Responses saved to {self.output_csv_path}")
         
-        return results_df
+        if not os.path.exists(self.output_csv_path) or os.path.getsize(self.output_csv_path) == 0:
+            return pd.DataFrame(columns=columns)
+        return pd.read_csv(self.output_csv_path)
     
-    def _generate_model_responses(self, client, question, num_runs):
+    async def _generate_question_responses(
+        self,
+        question: str,
+        num_runs: int,
+        models: Sequence[str],
+        semaphores: Dict[str, asyncio.Semaphore]
+    ) -> List[str]:
         """
-        Generate multiple responses for a single question using a specific client
+        Retrieve context once and generate every model's responses from it
         
-        :param client: LLM client (LMStudio or OpenAI)
-        :param question: Question to generate responses for
-        :param num_runs: Number of response generations
-        :return: List of generated responses
+        :return: num_runs responses per model, in models order
+        """
+        try:
+            context = await self.lmstudio_client.aretrieve_context(question)
+        except Exception as e:
+            self.logger.error(f"Retrieval failed: {str(e)}")
+            return [GENERATION_FAILED] * (num_runs * len(models))
+        
+        generations = [
+            self._generate_model_response(self.clients[model], semaphores[model], question, context, run)
+            for model in models
+            for run in range(num_runs)
+        ]
+        return list(await asyncio.gather(*generations))
+    
+    async def _generate_model_response(
+        self,
+        client: LLMClient,
+        semaphore: asyncio.Semaphore,
+        question: str,
+        context: str,
+        run: int
+    ) -> str:
         """
-        responses = []
+        Generate one response for a question from shared context
         
-        for run in range(num_runs):
+        :param client: LLM client (LMStudio or OpenAI)
+        :param semaphore: Limits generations in flight for this model
+        :param run: Run number, for logging
+        :return: Generated response, or a failure marker
+        """
+        async with semaphore:
             try:
-                response = client.query(question)
-                responses.append(response['response'])
-                self.logger.info(f"Generated response {run+1} for question")
+                response = await client.agenerate(question, context)
+                self.logger.info(f"Generated {client.model_type} response {run+1} for question")
+                return response['response']
             except Exception as e:
                 self.logger.error(f"Response generation failed: {str(e)}")
-                responses.append("Response generation failed")
-        
-        return responses
+                return GENERATION_FAILED
+    
+    def _completed_questions(self, columns: List[str]) -> set:
+        """Questions already in the output file, which must have the same columns"""
+        if not os.path.exists(self.output_csv_path) or os.path.getsize(self.output_csv_path) == 0:
+            return set()
+        existing = pd.read_csv(self.output_csv_path)
+        if list(existing.columns) != columns:
+            raise ValueError(
+                f"{self.output_csv_path} has columns {list(existing.columns)}, expected {columns}; "
+                "use a new output path for a different num_runs or models"
+            )
+        return set(existing['Questions'])
+    
+    def _append_row(self, columns: List[str], row: Dict[str, str]):
+        write_header = not os.path.exists(self.output_csv_path) or os.path.getsize(self.output_csv_path) == 0
+        with open(self.output_csv_path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            if write_header:
+                writer.writeheader()
+            writer.writerow(row)
+            f.flush()
 
 # Usage example
 if __name__ == "__main__":
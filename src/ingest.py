@@ -0,0 +1,111 @@
+# src/ingest.py
+"""Build or update the guideline index as a standalone job.
+
+Usage:
+    python -m src.ingest data/raw --workers 4 --embed-workers 8
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from src.config import settings
+from src.logger import setup_logger
+from src.rag.chunker import chunk_file, iter_source_files
+from src.rag.llm_client import LLMClient
+
+logger = setup_logger("ingest")
+
+
+def latency_percentiles(latencies: List[float]) -> Dict[str, Any]:
+    if not latencies:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 95, 99])
+    return {"count": len(latencies), "p50_ms": round(p50, 1), "p95_ms": round(p95, 1), "p99_ms": round(p99, 1)}
+
+
+def ingest(
+    path: str,
+    workers: int,
+    chunk_tokens: int = settings.CHUNK_TOKENS,
+    overlap_tokens: int = settings.CHUNK_OVERLAP_TOKENS,
+    client: Optional[LLMClient] = None
+) -> Dict[str, Any]:
+    """Chunk every file under path in a process pool and index the results.
+
+    Files are indexed as soon as their chunks come back, while the remaining
+    files are still being chunked. If the collection was built with other
+    chunk sizes, sources outside path are left marked for re-indexing.
+    Returns throughput and latency stats.
+    """
+    client = client or LLMClient(model_type="lmstudio", api_key=None, auto_index=False)
+    client.set_chunking(chunk_tokens, overlap_tokens)
+    files = [p.as_posix() for p in iter_source_files(path)]
+    if not files:
+        raise FileNotFoundError(f"No guideline files found at {path}")
+    logger.info(f"Ingesting {len(files)} files from {path} with {workers} chunking workers")
+
+    totals = {"chunks": 0, "new": 0, "added": 0, "deleted": 0}
+    embed_latencies: List[float] = []
+    start_time = time.time()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(chunk_file, f, chunk_tokens, overlap_tokens) for f in files]
+        for done, future in enumerate(as_completed(futures), 1):
+            file_path, chunks = future.result()
+            stats = client.index_chunks(file_path, chunks, embed_latencies)
+            for key in totals:
+                totals[key] += stats[key]
+            logger.info(f"[{done}/{len(files)}] {file_path}: {stats}")
+
+    elapsed = time.time() - start_time
+    report = {
+        "files": len(files),
+        **totals,
+        "seconds": round(elapsed, 2),
+        "docs_per_second": round(len(files) / elapsed, 2) if elapsed > 0 else None,
+        "chunks_per_second": round(totals["chunks"] / elapsed, 1) if elapsed > 0 else None,
+        "embed_latency": latency_percentiles(embed_latencies),
+        "store_count": client.vector_store.count()
+    }
+    logger.info(f"Ingestion finished: {json.dumps(report)}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index Uganda Clinical Guidelines files")
+    parser.add_argument("path", nargs="?", default=settings.DATA_PATH, help="Guideline file or directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Chunking processes")
+    parser.add_argument("--embed-workers", type=int, default=settings.EMBED_MAX_WORKERS, help="Parallel embedding requests")
+    parser.add_argument("--embed-batch-size", type=int, default=settings.EMBED_BATCH_SIZE, help="Chunks per embedding request")
+    parser.add_argument("--write-batch-size", type=int, default=settings.INDEX_WRITE_BATCH_SIZE, help="Chunks per store write and checkpoint")
+    parser.add_argument("--chunk-tokens", type=int, default=settings.CHUNK_TOKENS)
+    parser.add_argument("--overlap-tokens", type=int, default=settings.CHUNK_OVERLAP_TOKENS)
+    parser.add_argument("--backend", default=settings.VECTOR_STORE_BACKEND, choices=["chroma", "numpy"])
+    parser.add_argument("--report", help="Write the stats report to this JSON file")
+    args = parser.parse_args()
+
+    client = LLMClient(
+        model_type="lmstudio",
+        api_key=None,
+        embed_batch_size=args.embed_batch_size,
+        embed_max_workers=args.embed_workers,
+        index_write_batch_size=args.write_batch_size,
+        vector_store_backend=args.backend,
+        chunk_tokens=args.chunk_tokens,
+        chunk_overlap_tokens=args.overlap_tokens,
+        auto_index=False
+    )
+    report = ingest(args.path, args.workers, args.chunk_tokens, args.overlap_tokens, client)
+    print(json.dumps(report, indent=2))
+    if args.report:
+        Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.report).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
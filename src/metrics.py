@@ -0,0 +1,110 @@
+# src/metrics.py
+"""Latency histograms and gauges in the Prometheus text exposition format"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 500)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, List[float]] = {}  # bucket counts, then sum and count
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(labels, ('le', repr(float(bound))))} {cumulative:g}")
+            lines.append(f"{self.name}_bucket{_format_labels(labels, ('le', '+Inf'))} {values[-1]:g}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {values[-2]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {values[-1]:g}")
+        return lines
+
+
+def render_gauge(name: str, documentation: str, samples: Iterable[Tuple[Dict[str, str], float]]) -> List[str]:
+    """Render a gauge whose values are read at scrape time"""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(tuple(sorted(labels.items())))} {float(value):g}")
+    return lines
+
+
+def render_stats(prefix: str, label: str, stats_by_instance: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Render every numeric entry of component stats() dicts as a gauge"""
+    lines: List[str] = []
+    keys = sorted({
+        key for stats in stats_by_instance.values()
+        for key, value in stats.items() if isinstance(value, (int, float))
+    })
+    for key in keys:
+        samples = [
+            ({label: instance}, stats[key]) for instance, stats in stats_by_instance.items()
+            if isinstance(stats.get(key), (int, float))
+        ]
+        lines += render_gauge(f"{prefix}_{key}", f"{prefix.replace('_', ' ')} {key.replace('_', ' ')}", samples)
+    return lines
+
+
+STAGE_SECONDS = Histogram("rag_stage_seconds", "Time spent in each stage of a query or ingestion run")
+TOKENS_PER_SECOND = Histogram("rag_generation_tokens_per_second", "Completion tokens generated per second", RATE_BUCKETS)
+REQUEST_SECONDS = Histogram("rag_request_seconds", "End-to-end API request latency")
+QUEUE_SECONDS = Histogram("rag_queue_wait_seconds", "Time requests waited for a backend slot")
+
+
+class StageTimer:
+    """Collect per-stage timings for one operation and feed the stage histogram"""
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start_time)
+
+    def record(self, name: str, seconds: float):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+        STAGE_SECONDS.observe(seconds, operation=self.operation, stage=name)
+
+    def as_metadata(self) -> Dict[str, float]:
+        return {f"{name}_ms": round(seconds * 1000, 1) for name, seconds in self.timings.items()}
+
+
+def render_histograms() -> List[str]:
+    return STAGE_SECONDS.render() + TOKENS_PER_SECOND.render() + REQUEST_SECONDS.render() + QUEUE_SECONDS.render()
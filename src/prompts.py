@@ -16,4 +16,14 @@ Format your responses with:
 - Clear headings when appropriate
 - Numbered steps for procedures
 - Resource-level considerations
-- Follow-up recommendations"""
\ No newline at end of file
+- Follow-up recommendations"""
+
+SUMMARY_PROMPT = """Update the summary of a conversation between a healthcare worker and a medical assistant.
+Keep the patient details, conditions, drugs, doses and decisions that later questions may refer to.
+Write at most {max_words} words of plain text and nothing else.
+
+Current summary:
+{summary}
+
+New turns:
+{turns}"""
@@ -0,0 +1,108 @@
+# src/rag/answer_cache.py
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Sequence
+
+import numpy as np
+
+from src.logger import setup_logger
+
+logger = setup_logger("answer_cache")
+
+
+class SemanticAnswerCache:
+    """Cache of generated answers looked up by question-embedding similarity.
+
+    Entries live in namespaces (e.g. model and temperature) so an answer is
+    only reused for the same generation settings. A lookup returns the stored
+    answer of the most similar cached question if its cosine similarity is at
+    least ``threshold``. Entries expire after ``ttl_seconds`` and the least
+    recently used entry is evicted once ``max_entries`` is reached.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 1000, ttl_seconds: float = 86400):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._next_id = 0
+        # Per-namespace (entry ids, stacked normalized embeddings), rebuilt lazily
+        self._matrices: Dict[Hashable, Any] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        self._matrices.pop(entry["namespace"], None)
+
+    def _expire(self, now: float):
+        expired = [i for i, e in self._entries.items() if now - e["created_at"] > self.ttl_seconds]
+        for entry_id in expired:
+            self._remove(entry_id)
+        self.evictions += len(expired)
+
+    def _matrix(self, namespace: Hashable):
+        if namespace not in self._matrices:
+            ids = [i for i, e in self._entries.items() if e["namespace"] == namespace]
+            vectors = np.stack([self._entries[i]["embedding"] for i in ids]) if ids else None
+            self._matrices[namespace] = (ids, vectors)
+        return self._matrices[namespace]
+
+    def get(self, namespace: Hashable, embedding: Sequence[float]) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached answer for a similar question, if any"""
+        with self._lock:
+            self._expire(time.time())
+            ids, vectors = self._matrix(namespace)
+            if vectors is not None:
+                similarities = vectors @ self._normalize(embedding)
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    entry_id = ids[best]
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    result = copy.deepcopy(self._entries[entry_id]["value"])
+                    result["metadata"]["cache_similarity"] = round(float(similarities[best]), 4)
+                    logger.debug(f"Answer cache hit with similarity {similarities[best]:.4f}")
+                    return result
+            self.misses += 1
+            return None
+
+    def put(self, namespace: Hashable, embedding: Sequence[float], value: Dict[str, Any]):
+        """Store an answer for a question embedding"""
+        with self._lock:
+            while self._entries and len(self._entries) >= self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            self._entries[self._next_id] = {
+                "namespace": namespace,
+                "embedding": self._normalize(embedding),
+                "value": copy.deepcopy(value),
+                "created_at": time.time()
+            }
+            self._next_id += 1
+            self._matrices.pop(namespace, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrices.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
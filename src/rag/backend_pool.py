@@ -0,0 +1,150 @@
+# src/rag/backend_pool.py
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.logger import setup_logger
+
+logger = setup_logger("backend_pool")
+
+MAX_PENALTY_LATENCY = 60.0  # Seconds; cap on the latency estimate of a failing backend
+
+
+def is_backend_failure(error: Exception) -> bool:
+    """Connection errors, timeouts and 5xx count against a backend; 4xx do not"""
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    return status is None or status >= 500
+
+
+class Backend:
+    def __init__(self, url: str, initial_latency: float):
+        self.url = url
+        self.outstanding = 0
+        self.ewma_latency = initial_latency
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.probation = False
+        self.ejection_streak = 0
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+
+    def stats(self, now: float) -> Dict[str, Any]:
+        return {
+            "healthy": self.ejected_until <= now,
+            "probation": self.probation,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "ewma_latency_ms": round(self.ewma_latency * 1000, 1)
+        }
+
+
+class BackendPool:
+    """Route requests across OpenAI-compatible servers.
+
+    Each request goes to the healthy backend with the lowest
+    ``(outstanding + 1) * ewma_latency``, i.e. least outstanding requests
+    weighted by recent latency. A backend failing ``max_failures`` times in
+    a row is ejected for ``eject_seconds``, multiplied by the number of
+    ejections in a row (up to ten). Afterwards it is re-admitted on
+    probation: it receives one probe request at a time, a success restores
+    it fully and a failure ejects it again. If every backend is ejected, the
+    one due back soonest is used anyway.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        max_failures: int = 3,
+        eject_seconds: float = 30.0,
+        alpha: float = 0.3,
+        initial_latency: float = 1.0
+    ):
+        urls = [url.rstrip("/") for url in urls if url.strip()]
+        if not urls:
+            raise ValueError("BackendPool needs at least one URL")
+        self.backends = [Backend(url, initial_latency) for url in dict.fromkeys(urls)]
+        self.max_failures = max(1, max_failures)
+        self.eject_seconds = eject_seconds
+        self.alpha = alpha
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.backends)
+
+    def _pick(self) -> Backend:
+        now = time.monotonic()
+        healthy = [b for b in self.backends if b.ejected_until <= now]
+        if not healthy:
+            return min(self.backends, key=lambda b: b.ejected_until)
+        for backend in healthy:
+            if backend.probation and backend.outstanding == 0:
+                return backend
+        healthy = [b for b in healthy if not b.probation] or healthy
+        return min(healthy, key=lambda b: (b.outstanding + 1) * b.ewma_latency)
+
+    @contextmanager
+    def request(self) -> Iterator[str]:
+        """Reserve a backend for one request and yield its base URL"""
+        with self._lock:
+            backend = self._pick()
+            backend.outstanding += 1
+            backend.requests += 1
+        start_time = time.monotonic()
+        # Cancelled or abandoned requests (e.g. a closed stream) only free the slot
+        outcome = "aborted"
+        try:
+            yield backend.url
+            outcome = "ok"
+        except Exception as e:
+            outcome = "failed" if is_backend_failure(e) else "ok"
+            raise
+        finally:
+            self._finish(backend, time.monotonic() - start_time, outcome)
+
+    def _finish(self, backend: Backend, elapsed: float, outcome: str):
+        with self._lock:
+            backend.outstanding -= 1
+            if outcome == "ok":
+                if backend.probation:
+                    logger.info(f"Backend {backend.url} re-admitted")
+                    backend.probation = False
+                    backend.ejection_streak = 0
+                    backend.ewma_latency = elapsed
+                else:
+                    backend.ewma_latency += self.alpha * (elapsed - backend.ewma_latency)
+                backend.consecutive_failures = 0
+                return
+            if outcome != "failed":
+                return
+            backend.failures += 1
+            backend.consecutive_failures += 1
+            # Penalize so retries prefer the other backends
+            backend.ewma_latency = min(max(backend.ewma_latency, elapsed) * 2, MAX_PENALTY_LATENCY)
+            now = time.monotonic()
+            if backend.ejected_until > now:
+                return  # Already ejected by a concurrent request
+            if backend.probation or backend.consecutive_failures >= self.max_failures:
+                backend.probation = True
+                backend.ejection_streak = min(backend.ejection_streak + 1, 10)
+                eject_seconds = self.eject_seconds * backend.ejection_streak
+                backend.ejected_until = now + eject_seconds
+                backend.ejections += 1
+                logger.warning(
+                    f"Ejected backend {backend.url} for {eject_seconds}s "
+                    f"after {backend.consecutive_failures} consecutive failures"
+                )
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return {backend.url: backend.stats(now) for backend in self.backends}
+
+
+def parse_urls(urls: Optional[str], default: str) -> List[str]:
+    """Split a comma-separated URL list, falling back to a single default URL"""
+    parsed = [url.strip() for url in (urls or "").split(",") if url.strip()]
+    return parsed or [default]
@@ -0,0 +1,172 @@
+# src/rag/bm25.py
+import json
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.logger import setup_logger
+
+logger = setup_logger("bm25")
+
+# Keep doses ("500mg"), decimals and ICD codes ("K76.7") and hyphenated drug
+# names ("co-trimoxazole") together as single tokens
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse ranked ID lists, scoring each ID by the sum of 1 / (k + rank)"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """In-process inverted index with Okapi BM25 scoring.
+
+    Documents are added or removed by ID and ``build`` compiles the postings
+    into CSR-style NumPy arrays, so a search only touches the postings of the
+    query terms. ``save``/``load`` persist the compiled index.
+    """
+
+    DOCS_FILE = "documents.json"
+    POSTINGS_FILE = "postings.npz"
+
+    def __init__(self, index_dir: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        self.index_dir = Path(index_dir) if index_dir else None
+        self.k1 = k1
+        self.b = b
+        self._documents: Dict[str, str] = {}
+        self.ids: List[str] = []
+        self._terms: Dict[str, int] = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._rows = np.zeros(0, dtype=np.int32)
+        self._tfs = np.zeros(0, dtype=np.float32)
+        self._doc_lens = np.zeros(0, dtype=np.float32)
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def document(self, doc_id: str) -> Optional[str]:
+        return self._documents.get(doc_id)
+
+    def add(self, ids: Iterable[str], documents: Iterable[str]):
+        with self._lock:
+            for doc_id, document in zip(ids, documents):
+                if self._documents.get(doc_id) != document:
+                    self._documents[doc_id] = document
+                    self._dirty = True
+
+    def remove(self, ids: Iterable[str]):
+        with self._lock:
+            for doc_id in ids:
+                if self._documents.pop(doc_id, None) is not None:
+                    self._dirty = True
+
+    def build(self):
+        """Compile postings for the current documents"""
+        with self._lock:
+            if self._dirty:
+                self._build()
+
+    def _build(self):
+        self.ids = list(self._documents)
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        doc_lens = np.zeros(len(self.ids), dtype=np.float32)
+        for row, doc_id in enumerate(self.ids):
+            counts = Counter(tokenize(self._documents[doc_id]))
+            doc_lens[row] = sum(counts.values())
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((row, tf))
+
+        self._terms = {term: i for i, term in enumerate(postings)}
+        lengths = np.array([len(p) for p in postings.values()], dtype=np.int64)
+        self._offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        flat = [entry for p in postings.values() for entry in p]
+        self._rows = np.array([row for row, _ in flat], dtype=np.int32)
+        self._tfs = np.array([tf for _, tf in flat], dtype=np.float32)
+        self._doc_lens = doc_lens
+        self._dirty = False
+        logger.info(f"Built BM25 index over {len(self.ids)} documents and {len(self._terms)} terms")
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Return up to k (id, score) pairs ranked by BM25 score"""
+        with self._lock:
+            if self._dirty:
+                self._build()
+            return self._search(query, k)
+
+    def _search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        num_docs = len(self.ids)
+        if num_docs == 0:
+            return []
+        avg_len = float(self._doc_lens.mean()) or 1.0
+        length_norm = self.k1 * (1 - self.b + self.b * self._doc_lens / avg_len)
+
+        scores = np.zeros(num_docs, dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self._terms.get(term)
+            if term_id is None:
+                continue
+            start, end = self._offsets[term_id], self._offsets[term_id + 1]
+            rows, tfs = self._rows[start:end], self._tfs[start:end]
+            idf = np.log(1 + (num_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + length_norm[rows])
+
+        matched = np.flatnonzero(scores)
+        if len(matched) == 0:
+            return []
+        k = min(k, len(matched))
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[row], float(scores[row])) for row in top]
+
+    def save(self):
+        """Build if needed and write the index to index_dir atomically"""
+        if self.index_dir is None:
+            return
+        with self._lock:
+            if self._dirty:
+                self._build()
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            docs_tmp = self.index_dir / (self.DOCS_FILE + ".tmp")
+            postings_tmp = self.index_dir / (self.POSTINGS_FILE + ".tmp")
+            with open(docs_tmp, "w", encoding="utf-8") as f:
+                json.dump({"ids": self.ids, "documents": [self._documents[i] for i in self.ids], "terms": list(self._terms)}, f)
+            with open(postings_tmp, "wb") as f:
+                np.savez(f, offsets=self._offsets, rows=self._rows, tfs=self._tfs, doc_lens=self._doc_lens)
+            os.replace(docs_tmp, self.index_dir / self.DOCS_FILE)
+            os.replace(postings_tmp, self.index_dir / self.POSTINGS_FILE)
+
+    def load(self) -> bool:
+        """Load a saved index, returning False if none exists"""
+        if self.index_dir is None:
+            return False
+        docs_path = self.index_dir / self.DOCS_FILE
+        postings_path = self.index_dir / self.POSTINGS_FILE
+        if not docs_path.exists() or not postings_path.exists():
+            return False
+        data = json.loads(docs_path.read_text(encoding="utf-8"))
+        postings = np.load(postings_path)
+        self.ids = data["ids"]
+        self._documents = dict(zip(data["ids"], data["documents"]))
+        self._terms = {term: i for i, term in enumerate(data["terms"])}
+        self._offsets = postings["offsets"]
+        self._rows = postings["rows"]
+        self._tfs = postings["tfs"]
+        self._doc_lens = postings["doc_lens"]
+        self._dirty = False
+        logger.info(f"Loaded BM25 index with {len(self.ids)} documents from {self.index_dir}")
+        return True
@@ -0,0 +1,130 @@
+# src/rag/chunker.py
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Tuple, TypeVar, Union
+
+from src.config import settings
+from src.rag.context import estimate_tokens
+
+SOURCE_SUFFIXES = (".txt", ".md")
+
+T = TypeVar("T")
+
+
+class Chunk(NamedTuple):
+    text: str
+    source: str
+    section: str
+    subsection: str
+
+
+def iter_source_files(path: Union[str, Path]) -> Iterator[Path]:
+    """Yield the guideline file at path, or every text file under a directory"""
+    path = Path(path)
+    if path.is_dir():
+        yield from sorted(
+            p for p in path.rglob("*")
+            if p.is_file() and p.suffix.lower() in SOURCE_SUFFIXES
+        )
+    elif path.exists():
+        yield path
+
+
+def iter_file_chunks(
+    file_path: Union[str, Path],
+    max_tokens: int = settings.CHUNK_TOKENS,
+    overlap_tokens: int = settings.CHUNK_OVERLAP_TOKENS
+) -> Iterator[Chunk]:
+    """Lazily split one file into chunks, reading it line by line.
+
+    ``# `` lines start a new section and ``## `` lines a new subsection; both
+    end the current chunk. Within a subsection a chunk is closed once it
+    reaches ``max_tokens`` and the next one starts with up to
+    ``overlap_tokens`` of its trailing lines. Each chunk's text is prefixed
+    with its section and subsection headings.
+
+    Raises ValueError unless 0 <= overlap_tokens < max_tokens, since a chunk
+    could otherwise be carried over whole and never make progress.
+    """
+    if max_tokens <= 0 or not 0 <= overlap_tokens < max_tokens:
+        raise ValueError(
+            f"overlap_tokens must be in [0, max_tokens), got overlap_tokens={overlap_tokens}, max_tokens={max_tokens}"
+        )
+    return _iter_file_chunks(file_path, max_tokens, overlap_tokens)
+
+
+def _iter_file_chunks(file_path: Union[str, Path], max_tokens: int, overlap_tokens: int) -> Iterator[Chunk]:
+    source = Path(file_path).as_posix()
+    section = ""
+    subsection = ""
+    lines: List[str] = []
+    tokens = 0
+    has_new_lines = False
+
+    def make_chunk() -> Chunk:
+        return Chunk(f"{section}\n{subsection}\n" + "\n".join(lines), source, section, subsection)
+
+    with open(file_path, "r", encoding="utf-8") as f:
+        for raw_line in f:
+            line = raw_line.strip()
+            if not line:
+                continue
+
+            if line.startswith("# ") or line.startswith("## "):
+                if has_new_lines:
+                    yield make_chunk()
+                if line.startswith("# "):
+                    section = line
+                    subsection = ""
+                else:
+                    subsection = line
+                lines = []
+                tokens = 0
+                has_new_lines = False
+                continue
+
+            lines.append(line)
+            tokens += estimate_tokens(line)
+            has_new_lines = True
+            if tokens >= max_tokens:
+                yield make_chunk()
+                # Carry trailing lines into the next chunk as overlap
+                overlap: List[str] = []
+                overlap_size = 0
+                for previous in reversed(lines):
+                    size = estimate_tokens(previous)
+                    if overlap_size + size > overlap_tokens:
+                        break
+                    overlap.insert(0, previous)
+                    overlap_size += size
+                lines = overlap
+                tokens = overlap_size
+                has_new_lines = False
+
+    if has_new_lines:
+        yield make_chunk()
+
+
+def chunk_file(file_path: str, max_tokens: int, overlap_tokens: int) -> Tuple[str, List[Chunk]]:
+    """Chunk a whole file; picklable entry point for process pools"""
+    return file_path, list(iter_file_chunks(file_path, max_tokens, overlap_tokens))
+
+
+def iter_chunks(
+    path: Union[str, Path],
+    max_tokens: int = settings.CHUNK_TOKENS,
+    overlap_tokens: int = settings.CHUNK_OVERLAP_TOKENS
+) -> Iterator[Chunk]:
+    """Lazily chunk a file or every guideline file under a directory"""
+    for file_path in iter_source_files(path):
+        yield from iter_file_chunks(file_path, max_tokens, overlap_tokens)
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Group an iterable into lists of at most size items"""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
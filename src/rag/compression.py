@@ -0,0 +1,112 @@
+# src/rag/compression.py
+import math
+import re
+from typing import Dict, List, NamedTuple, Sequence, Set
+
+from src.rag.bm25 import tokenize
+from src.rag.context import estimate_tokens
+
+IMAGE_MARKER = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+# Sentence ends, OCR bullets ("‰") and table cell borders all separate units
+UNIT_BOUNDARY = re.compile(r"(?<=[.!?;])\s+(?=[A-Z(])|\s*[‰•|]\s*")
+DOSE_PATTERN = re.compile(
+    r"\d\s*(?:mg|g|mcg|micrograms?|µg|ml|mL|IU|units?|mmol|%|tablets?|tabs?|drops?)\b(?:\s*/\s*kg)?",
+    re.IGNORECASE
+)
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it of on or should the to what when "
+    "which who why with my patient patients treat treated treatment manage managed management".split()
+)
+
+
+class Unit(NamedTuple):
+    document: int
+    position: int
+    text: str
+    tokens: int
+    terms: Set[str]
+    dose: bool
+
+
+def split_units(body: str) -> List[str]:
+    """Split chunk text into sentence-sized units without image markers or table padding"""
+    units = []
+    for line in IMAGE_MARKER.sub(" ", body).splitlines():
+        for unit in UNIT_BOUNDARY.split(line):
+            unit = " ".join(unit.split())
+            if len(unit) > 2 and any(c.isalnum() for c in unit):
+                units.append(unit)
+    return units
+
+
+def compress_context(
+    question: str,
+    documents: Sequence[str],
+    token_budget: int = 600,
+    dose_weight: float = 0.5
+) -> str:
+    """Keep the sentences of the retrieved chunks that matter to the question.
+
+    Each chunk's first two lines are its section and subsection headings;
+    the rest is split into sentences, bullets and table cells. Units are
+    scored by the IDF-weighted overlap of their terms with the question,
+    scaled down slightly for chunks ranked lower. Dose lines (``500 mg``,
+    ``10 mg/kg``...) in a chunk that matched at all score at least
+    ``dose_weight`` times that chunk's best unit, so doses next to the
+    matching text survive. The best units are kept up to ``token_budget``
+    and returned under their headings in their original order. If nothing
+    matches the question the documents are returned unchanged.
+    """
+    query_terms = {term for term in tokenize(question) if term not in STOPWORDS}
+    headings: List[str] = []
+    units: List[Unit] = []
+    for index, document in enumerate(documents):
+        lines = document.split("\n", 2)
+        headings.append("\n".join(line for line in lines[:2] if line.strip()))
+        for position, text in enumerate(split_units(lines[2] if len(lines) > 2 else "")):
+            units.append(Unit(index, position, text, estimate_tokens(text), set(tokenize(text)), bool(DOSE_PATTERN.search(text))))
+    if not units or not query_terms:
+        return "\n".join(documents)
+
+    document_frequency: Dict[str, int] = {}
+    for unit in units:
+        for term in unit.terms & query_terms:
+            document_frequency[term] = document_frequency.get(term, 0) + 1
+    idf = {term: math.log(1 + len(units) / count) for term, count in document_frequency.items()}
+
+    scores = []
+    for unit in units:
+        overlap = sum(idf[term] for term in unit.terms & query_terms)
+        scores.append(overlap / math.sqrt(max(len(unit.terms), 4)) / (1 + 0.1 * unit.document))
+    best_in_document: Dict[int, float] = {}
+    for unit, score in zip(units, scores):
+        best_in_document[unit.document] = max(best_in_document.get(unit.document, 0.0), score)
+    if not any(best_in_document.values()):
+        return "\n".join(documents)
+    scores = [
+        max(score, dose_weight * best_in_document[unit.document]) if unit.dose else score
+        for unit, score in zip(units, scores)
+    ]
+
+    chosen: Set[int] = set()
+    documents_used: Set[int] = set()
+    used_tokens = 0
+    for index in sorted(range(len(units)), key=lambda i: -scores[i]):
+        if scores[index] <= 0:
+            break
+        unit = units[index]
+        cost = unit.tokens
+        if unit.document not in documents_used:
+            cost += estimate_tokens(headings[unit.document])
+        if chosen and used_tokens + cost > token_budget:
+            continue
+        chosen.add(index)
+        documents_used.add(unit.document)
+        used_tokens += cost
+
+    sections = []
+    for document in sorted(documents_used):
+        kept = [unit.text for i, unit in enumerate(units) if i in chosen and unit.document == document]
+        sections.append("\n".join(([headings[document]] if headings[document] else []) + kept))
+    return "\n".join(sections)
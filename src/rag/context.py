@@ -0,0 +1,105 @@
+# src/rag/context.py
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text)"""
+    return max(1, (len(text) + 3) // 4)
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def cosine_similarities(query_embedding: Sequence[float], embeddings: Sequence[Sequence[float]]) -> np.ndarray:
+    """Cosine similarity of every embedding to the query embedding"""
+    vectors = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+    query = _normalize_rows(np.asarray(query_embedding, dtype=np.float32)[None, :])[0]
+    return vectors @ query
+
+
+def mmr_select(
+    relevance: Sequence[float],
+    embeddings: Sequence[Sequence[float]],
+    k: int,
+    lambda_mult: float = 0.7
+) -> List[int]:
+    """Order up to k candidates by Maximal Marginal Relevance.
+
+    Each step picks the candidate maximizing
+    ``lambda_mult * relevance - (1 - lambda_mult) * max similarity to the
+    already selected candidates``. Pairwise similarities are computed once as
+    a single matrix product.
+    """
+    relevance = np.asarray(relevance, dtype=np.float32)
+    num_candidates = len(relevance)
+    if num_candidates == 0 or k <= 0:
+        return []
+    vectors = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+    pairwise = vectors @ vectors.T
+
+    selected: List[int] = []
+    max_similarity = np.full(num_candidates, -np.inf, dtype=np.float32)
+    available = np.ones(num_candidates, dtype=bool)
+    for _ in range(min(k, num_candidates)):
+        redundancy = np.where(np.isfinite(max_similarity), max_similarity, 0.0)
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, pairwise[best])
+    return selected
+
+
+def select_context(
+    documents: Sequence[str],
+    embeddings: Sequence[Sequence[float]],
+    similarities: Sequence[float],
+    max_chunks: int,
+    lambda_mult: float = 0.7,
+    max_relevance_gap: float = 0.5,
+    token_budget: Optional[int] = None,
+    ranking_scores: Optional[Sequence[float]] = None
+) -> List[int]:
+    """Choose which candidate chunks go into the prompt.
+
+    ``similarities`` are question-chunk cosine similarities, scaled so the
+    best candidate has relevance 1. A candidate is skipped if its relevance
+    falls more than ``max_relevance_gap`` below the best one or if it would
+    exceed ``token_budget``, so fewer than ``max_chunks`` may be returned.
+    Candidates are ordered by MMR over ``ranking_scores`` (e.g. fused hybrid
+    scores, higher is better) if given, otherwise over the relevance. The
+    first candidate in MMR order is always kept.
+
+    Returns indices into ``documents`` in prompt order.
+    """
+    if not documents:
+        return []
+    relevance = _scale_to_best(similarities)
+    ranking = relevance if ranking_scores is None else _scale_to_best(ranking_scores)
+
+    chosen: List[int] = []
+    used_tokens = 0
+    for index in mmr_select(ranking, embeddings, len(documents), lambda_mult):
+        if len(chosen) >= max_chunks:
+            break
+        tokens = estimate_tokens(documents[index])
+        if chosen:
+            if 1.0 - relevance[index] > max_relevance_gap:
+                continue
+            if token_budget is not None and used_tokens + tokens > token_budget:
+                continue
+        chosen.append(index)
+        used_tokens += tokens
+    return chosen
+
+
+def _scale_to_best(scores: Sequence[float]) -> np.ndarray:
+    scores = np.asarray(scores, dtype=np.float32)
+    top = float(scores.max())
+    return scores / top if top > 0 else np.ones_like(scores)
@@ -0,0 +1,75 @@
+# src/rag/embedding_batcher.py
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from src.logger import setup_logger
+
+logger = setup_logger("embedding_batcher")
+
+BatchEmbedFn = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+class EmbeddingBatcher:
+    """Coalesce concurrent embedding requests into batched calls.
+
+    The first request to arrive opens a window of ``max_wait_ms``; every
+    request arriving within it joins the same batch, which is sent early once
+    it holds ``max_batch_size`` texts. Each caller gets back its own
+    embedding, or the batch's exception if the call failed.
+    """
+
+    def __init__(self, embed_batch: BatchEmbedFn, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.embed_batch = embed_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.requests = 0
+
+    async def embed(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self.requests += 1
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            self.batches += 1
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]):
+        # Identical questions in one window share a single input
+        texts: Dict[str, int] = {}
+        for text, _ in batch:
+            texts.setdefault(text, len(texts))
+        try:
+            embeddings = await self.embed_batch(list(texts))
+        except Exception as e:
+            logger.error(f"Batched embedding of {len(texts)} texts failed: {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for text, future in batch:
+            if not future.done():
+                future.set_result(embeddings[texts[text]])
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0
+        }
@@ -0,0 +1,260 @@
+# src/rag/embedding_cache.py
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.logger import setup_logger
+from src.rag.file_lock import exclusive_lock
+
+logger = setup_logger("embedding_cache")
+
+
+class _ModelShard:
+    """Vectors and index rows for a single embedding model.
+
+    Appends hold an exclusive file lock and first catch up with rows other
+    processes appended, so several processes can share one cache directory.
+    """
+
+    LOCK_FILE = "append.lock"
+
+    def __init__(self, shard_dir: Path):
+        self.shard_dir = shard_dir
+        self.vectors_path = shard_dir / EmbeddingCache.VECTORS_FILE
+        self.index_path = shard_dir / EmbeddingCache.INDEX_FILE
+        self.meta_path = shard_dir / EmbeddingCache.META_FILE
+        self.lock_path = shard_dir / self.LOCK_FILE
+        self.index: Dict[str, int] = {}
+        self.dim: Optional[int] = None
+        self.num_rows = 0
+        self.vectors: Optional[np.memmap] = None
+        self._index_offset = 0  # Bytes of index.tsv already read
+        self._refresh()
+
+    def _refresh(self) -> int:
+        """Pick up rows appended since the last refresh, by us or other processes.
+
+        Index rows whose vectors never made it to disk (or are only partly
+        written) are ignored. Returns the number of whole rows on disk.
+        """
+        if self.dim is None and self.meta_path.exists():
+            self.dim = json.loads(self.meta_path.read_text())["dim"]
+        if self.dim is None or not self.vectors_path.exists():
+            return 0
+
+        disk_rows = self.vectors_path.stat().st_size // (4 * self.dim)
+        if self.index_path.exists():
+            with open(self.index_path, "rb") as f:
+                f.seek(self._index_offset)
+                for raw_line in f:
+                    if not raw_line.endswith(b"\n"):
+                        break  # Being written; read it next time
+                    self._index_offset += len(raw_line)
+                    parts = raw_line.decode("utf-8").rstrip("\n").split("\t")
+                    if len(parts) == 2 and int(parts[1]) < disk_rows:
+                        self.index[parts[0]] = int(parts[1])
+        if disk_rows != self.num_rows:
+            self.num_rows = disk_rows
+            self._remap()
+        return disk_rows
+
+    def _remap(self):
+        if self.num_rows == 0:
+            self.vectors = None
+            return
+        self.vectors = np.memmap(
+            self.vectors_path, dtype=np.float32, mode="r", shape=(self.num_rows, self.dim)
+        )
+
+    def append(self, keys: List[str], block: np.ndarray):
+        """Append vectors for keys that are not cached yet, by this or any other process"""
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        with exclusive_lock(self.lock_path):
+            start = self._refresh()
+            if self.dim is None:
+                self.dim = block.shape[1]
+                self.meta_path.write_text(json.dumps({"dim": self.dim}))
+            elif block.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {block.shape[1]} does not match cache dimension {self.dim}")
+
+            fresh = [i for i, key in enumerate(keys) if key not in self.index]
+            if not fresh:
+                return
+            keys = [keys[i] for i in fresh]
+            block = block[fresh]
+
+            # Writers hold the lock, so bytes past the last whole row can only
+            # be a torn row left by a crashed writer; overwrite it
+            row_bytes = 4 * self.dim
+            with open(self.vectors_path, "ab") as f:
+                if f.tell() > start * row_bytes:
+                    logger.warning(f"Overwriting partial row at the end of {self.vectors_path}")
+                    f.truncate(start * row_bytes)
+                f.write(block.tobytes())
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                for offset, key in enumerate(keys):
+                    f.write(f"{key}\t{start + offset}\n")
+            self._refresh()
+
+
+class EmbeddingCache:
+    """Content-addressed on-disk cache of embeddings.
+
+    Each embedding model gets its own subdirectory, so switching models (and
+    vector dimensions) never mixes rows. Vectors are appended to a contiguous
+    float32 file that is memory-mapped for reads. A tab-separated index file
+    maps the hash of (embedding model, text) to a row in that file. Both files
+    are append-only, so a crash can at worst lose the last few entries, and
+    appends are serialized across processes by a lock file per model.
+    """
+
+    VECTORS_FILE = "vectors.f32"
+    INDEX_FILE = "index.tsv"
+    META_FILE = "meta.json"
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._shards: Dict[str, _ModelShard] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        """Hash of (embedding model, text) used as the cache key"""
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _shard(self, model: str) -> _ModelShard:
+        shard = self._shards.get(model)
+        if shard is None:
+            shard_dir = self.cache_dir / hashlib.sha256(model.encode("utf-8")).hexdigest()[:16]
+            shard = self._shards[model] = _ModelShard(shard_dir)
+            if shard.index:
+                logger.info(f"Loaded embedding cache with {len(shard.index)} entries for {model} from {shard_dir}")
+        return shard
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(shard.index) for shard in self._shards.values())
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        return self.get_many(model, [text])[0]
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Look up embeddings for texts, returning None for cache misses"""
+        results: List[Optional[List[float]]] = []
+        with self._lock:
+            shard = self._shard(model)
+            for text in texts:
+                row = shard.index.get(self.key(model, text))
+                if row is None or shard.vectors is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self.hits += 1
+                    results.append(shard.vectors[row].tolist())
+        return results
+
+    def put(self, model: str, text: str, embedding: Sequence[float]):
+        self.put_many(model, [text], [embedding])
+
+    def put_many(self, model: str, texts: Sequence[str], embeddings: Sequence[Sequence[float]]):
+        """Append embeddings for texts that are not cached yet.
+
+        Raises ValueError if the vectors do not match the dimension already
+        cached for this model.
+        """
+        with self._lock:
+            shard = self._shard(model)
+            new_keys: List[str] = []
+            seen = set()
+            new_vectors = []
+            for text, embedding in zip(texts, embeddings):
+                key = self.key(model, text)
+                if key in shard.index or key in seen:
+                    continue
+                seen.add(key)
+                new_keys.append(key)
+                new_vectors.append(embedding)
+            if new_keys:
+                shard.append(new_keys, np.asarray(new_vectors, dtype=np.float32))
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses}
+
+
+class EmbeddingMemo:
+    """Bounded in-memory LRU memo of query embeddings.
+
+    Keys are (embedding model, normalized text), where normalization collapses
+    whitespace and case so trivially different spellings of a question share
+    an entry. Vectors are kept as float32 arrays and the memo evicts least
+    recently used entries once their total size exceeds ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(text.split()).casefold()
+
+    @staticmethod
+    def _entry_bytes(key: Tuple[str, str], vector: np.ndarray) -> int:
+        return vector.nbytes + len(key[0]) + len(key[1])
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        key = (model, self.normalize(text))
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector.tolist()
+
+    def put(self, model: str, text: str, embedding: Sequence[float]):
+        key = (model, self.normalize(text))
+        vector = np.asarray(embedding, dtype=np.float32)
+        entry_bytes = self._entry_bytes(key, vector)
+        if entry_bytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= self._entry_bytes(key, previous)
+            self._entries[key] = vector
+            self.size_bytes += entry_bytes
+            while self.size_bytes > self.max_bytes:
+                old_key, old_vector = self._entries.popitem(last=False)
+                self.size_bytes -= self._entry_bytes(old_key, old_vector)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,28 @@
+# src/rag/file_lock.py
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, so only one writer process is safe
+    fcntl = None
+
+
+@contextmanager
+def exclusive_lock(lock_path: Union[str, Path]) -> Iterator[None]:
+    """Hold an exclusive advisory lock on lock_path across processes.
+
+    Blocks until the lock is free. The lock file is created if needed and
+    left in place, since removing it would race with other waiters.
+    """
+    lock_path = Path(lock_path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -1,19 +1,37 @@
 # src/rag/llm_client.py
+import httpx
+import json
 import requests
+import threading
 import time
-from typing import Dict, Any, List, Optional
-from openai import OpenAI
-import chromadb
-from chromadb.config import Settings
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import AsyncIterator, Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from requests.adapters import HTTPAdapter
+from openai import AsyncOpenAI, OpenAI
 from pathlib import Path
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from src.config import settings
 from src.logger import setup_logger
-from src.prompts import SYSTEM_PROMPT
+from src.metrics import TOKENS_PER_SECOND, StageTimer
+from src.prompts import SUMMARY_PROMPT, SYSTEM_PROMPT
+from src.rag.answer_cache import SemanticAnswerCache
+from src.rag.backend_pool import BackendPool, parse_urls
+from src.rag.bm25 import BM25Index, reciprocal_rank_fusion
+from src.rag.chunker import Chunk, batched, iter_file_chunks, iter_source_files
+from src.rag.compression import compress_context
+from src.rag.context import cosine_similarities, select_context
+from src.rag.embedding_batcher import EmbeddingBatcher
+from src.rag.embedding_cache import EmbeddingCache, EmbeddingMemo
+from src.rag.manifest import IndexManifest, chunk_id
+from src.rag.session_memory import trim_history
+from src.rag.vector_store import ReadOnlyStoreError, SnapshotVectorStore, open_vector_store
 
 logger = setup_logger("llm_client")
 
+# Query embedding memo shared by every LLMClient in the process
+query_embedding_memo = EmbeddingMemo(max_bytes=settings.QUERY_EMBEDDING_MEMO_BYTES)
+
 class LLMClient:
     def __init__(
         self,
@@ -21,216 +39,938 @@ class LLMClient:
         model_name: str = "llama-3.2-3b-instruct",
         api_key: Optional[str] = settings.OPENAI_API_KEY,
         base_url: str = settings.LM_STUDIO_URL,
+        backend_pool: Optional[BackendPool] = None,
         chroma_host: str = settings.CHROMA_HOST,
         chroma_port: int = settings.CHROMA_PORT,
         data_path: str = settings.DATA_PATH,
-        reset_collection: bool = False
+        reset_collection: bool = False,
+        embedding_model: str = settings.EMBEDDING_MODEL,
+        embed_batch_size: int = settings.EMBED_BATCH_SIZE,
+        embed_max_workers: int = settings.EMBED_MAX_WORKERS,
+        embedding_cache_dir: Optional[str] = settings.EMBEDDING_CACHE_DIR,
+        manifest_path: str = settings.INDEX_MANIFEST_PATH,
+        chunk_tokens: int = settings.CHUNK_TOKENS,
+        chunk_overlap_tokens: int = settings.CHUNK_OVERLAP_TOKENS,
+        index_write_batch_size: int = settings.INDEX_WRITE_BATCH_SIZE,
+        vector_store_backend: str = settings.VECTOR_STORE_BACKEND,
+        vector_store_dir: str = settings.VECTOR_STORE_DIR,
+        snapshot_dir: str = settings.SNAPSHOT_DIR,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        embedding_memo: Optional[EmbeddingMemo] = None,
+        hybrid_search: bool = settings.HYBRID_SEARCH,
+        lexical_index_dir: str = settings.LEXICAL_INDEX_DIR,
+        auto_index: bool = True
     ):
         self.model_type = model_type
         self.model_name = model_name
         self.base_url = base_url.rstrip('/')
+        # LM Studio (or other OpenAI-compatible) servers serving embeddings and
+        # local generations, balanced by outstanding requests and latency
+        self.backends = backend_pool or BackendPool(
+            parse_urls(settings.LM_STUDIO_URLS, self.base_url),
+            max_failures=settings.BACKEND_EJECT_AFTER_FAILURES,
+            eject_seconds=settings.BACKEND_EJECT_SECONDS
+        )
         self.data_path = Path(data_path)
+        self.embedding_model = embedding_model
+        self.embed_batch_size = max(1, embed_batch_size)
+        self.embed_max_workers = max(1, embed_max_workers)
+        self.index_write_batch_size = max(1, index_write_batch_size)
+        self.n_results = settings.RETRIEVAL_N_RESULTS
+        self.hybrid_candidates = max(self.n_results, settings.HYBRID_CANDIDATES)
+        self.context_selection = settings.CONTEXT_SELECTION
+        self.context_candidates = max(self.n_results, settings.CONTEXT_CANDIDATES)
+        self.context_compression = settings.CONTEXT_COMPRESSION
+        
+        # Pooled HTTP session shared by all embedding and completion calls
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.embed_max_workers,
+            pool_maxsize=self.embed_max_workers
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        # On-disk embedding cache so unchanged chunks are never re-embedded
+        self.embedding_cache = EmbeddingCache(embedding_cache_dir) if embedding_cache_dir else None
+        self.embedding_memo = embedding_memo or query_embedding_memo
+        
+        # Semantic cache of generated answers, keyed by model and temperature
+        if answer_cache is None and settings.ANSWER_CACHE_ENABLED:
+            answer_cache = SemanticAnswerCache(
+                threshold=settings.ANSWER_CACHE_THRESHOLD,
+                max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+                ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS
+            )
+        self.answer_cache = answer_cache
+        
+        # Pooled async HTTP client for the async query path, created on first use
+        self._async_http: Optional[httpx.AsyncClient] = None
+        
+        # Coalesce question embeddings from concurrent requests into one call
+        self.embedding_batcher = None
+        if settings.QUERY_EMBED_BATCH_WINDOW_MS > 0:
+            self.embedding_batcher = EmbeddingBatcher(
+                self._arequest_embeddings_batch,
+                max_batch_size=settings.QUERY_EMBED_BATCH_MAX,
+                max_wait_ms=settings.QUERY_EMBED_BATCH_WINDOW_MS
+            )
         
         # Initialize OpenAI client if needed for GPT-4 queries
         if api_key:
             self.openai_client = OpenAI(api_key=api_key)
+            self.async_openai_client = AsyncOpenAI(api_key=api_key)
         
-        # Initialize ChromaDB
-        self.chroma_client = chromadb.HttpClient(
-            host=chroma_host,
-            port=chroma_port,
-            settings=Settings(anonymized_telemetry=False)
-        )
-        
+        # Initialize the vector store (Chroma over HTTP or in-process NumPy)
         # Use same collection name for both models since using same embeddings
         collection_name = "medical_guidelines_nomic"
-        try:
-            # Try to get existing collection first
-            self.collection = self.chroma_client.get_collection(name=collection_name)
-            logger.info(f"Using existing collection: {collection_name}")
-            # logger.info(f"Collection has {self.collection.count()} documents")
-        except:
-            # Create new collection if it doesn't exist
-            self.collection = self.chroma_client.create_collection(
-                name=collection_name,
-                get_or_create=True
-            )
-            logger.info(f"Created new collection: {collection_name}")
-            
+        self.vector_store, created = open_vector_store(
+            vector_store_backend,
+            collection_name,
+            chroma_host=chroma_host,
+            chroma_port=chroma_port,
+            store_dir=vector_store_dir,
+            snapshot_dir=snapshot_dir,
+            rescore_factor=settings.SNAPSHOT_RESCORE_FACTOR
+        )
+        self.manifest = IndexManifest(manifest_path, f"{vector_store_backend}:{collection_name}")
+        
+        if created:
+            # A fresh collection makes any previous manifest meaningless
+            self.manifest.reset()
+        elif not self.vector_store.read_only and not self.manifest.tracked:
+            # Built before the manifest existed (e.g. doc_0..doc_N IDs): once
+            # every source is indexed under content-hash IDs, drop the rest
+            self.manifest.info["purge_unlisted"] = True
+            self.manifest.save()
+        self.chunk_tokens = chunk_tokens
+        self.chunk_overlap_tokens = chunk_overlap_tokens
+        if not self.vector_store.read_only:
+            self.set_chunking(chunk_tokens, chunk_overlap_tokens)
+        
+        # BM25 index over the same chunks, fused with vector results at query time
+        self.lexical_index = None
+        if hybrid_search:
+            lexical_dir = Path(lexical_index_dir) / collection_name
+            if isinstance(self.vector_store, SnapshotVectorStore):
+                # Lives inside the snapshot, so re-exporting the snapshot discards it
+                lexical_dir = self.vector_store.snapshot_dir / SnapshotVectorStore.LEXICAL_DIR
+            self.lexical_index = BM25Index(str(lexical_dir))
+            if not created:
+                self.lexical_index.load()
+        
+        # Progress of the current indexing run, reported by the readiness probe
+        self.index_progress: Dict[str, Any] = {
+            "sources_total": 0,
+            "sources_done": 0,
+            "chunks_added": 0,
+            "current_source": None
+        }
+        self._stop_indexing = threading.Event()
+        
+        self._store_created = created
+        if auto_index:
+            self.ensure_index()
+
+    def ensure_index(self):
+        """Make sure the index is usable, ingesting or resuming as needed.
+
+        Loads DATA_PATH into a newly created collection, resumes sources whose
+        ingestion was interrupted or never started, and rebuilds a missing
+        lexical index from the indexed sources (their chunks are already
+        embedded). A read-only snapshot store is served as is; only its
+        lexical index is built, from the snapshot texts, if it is missing or
+        does not match the snapshot. Raises ReadOnlyStoreError if the manifest
+        still expects indexing work on a read-only store.
+        """
+        if self.vector_store.read_only:
+            if self.manifest.incomplete_sources() or self.manifest.info.get("purge_unlisted"):
+                raise ReadOnlyStoreError(
+                    f"{self.manifest.path} has unfinished indexing for {self.manifest.collection_name}, "
+                    "which is served read-only; re-export the snapshot from a writable backend "
+                    "or remove the collection from the manifest"
+                )
+            if self.lexical_index is not None and len(self.lexical_index) != self.vector_store.count():
+                logger.info("Building lexical index from the snapshot")
+                self.lexical_index = BM25Index(str(self.lexical_index.index_dir))
+                for batch in self.vector_store.iter_records():
+                    self.lexical_index.add(batch["ids"], batch["documents"])
+                try:
+                    self.lexical_index.save()
+                except OSError as e:
+                    # E.g. a snapshot on a read-only mount; keep the index in memory
+                    self.lexical_index.build()
+                    logger.warning(f"Could not save lexical index in the snapshot: {str(e)}")
+            return
+        
+        if self._store_created:
             # Only load documents for new collections
             if self.data_path.exists():
                 logger.info("Starting document loading...")
                 self.add_documents(str(self.data_path))
             else:
                 logger.error(f"Data path not found: {self.data_path}")
+            self._store_created = False
+            return
+        
+        sources = set(self.manifest.incomplete_sources())
+        sources.update(
+            p.as_posix() for p in iter_source_files(self.data_path)
+            if not self.manifest.has_source(p.as_posix())
+        )
+        for source in sorted(sources):
+            logger.info(f"Resuming ingestion of {source}")
+            self.add_documents(source)
+        if self.lexical_index is not None and len(self.lexical_index) == 0:
+            for source in self.manifest.sources:
+                if source not in sources:
+                    logger.info(f"Building lexical index for {source}")
+                    self.add_documents(source)
+        self.purge_unlisted_chunks()
+
+    def purge_unlisted_chunks(self):
+        """Delete chunks that no manifest source lists, once, after adopting a
+        collection that predates the manifest.
+
+        Waits until every source is completely indexed, so the collection is
+        never left without the chunks it is replacing.
+        """
+        if not self.manifest.info.get("purge_unlisted"):
+            return
+        if self.vector_store.read_only:
+            raise ReadOnlyStoreError(
+                f"Cannot purge unlisted chunks from read-only {self.manifest.collection_name}; "
+                "re-export the snapshot from a writable backend"
+            )
+        if self._stop_indexing.is_set() or self.manifest.incomplete_sources():
+            logger.info("Keeping unlisted chunks until every source is indexed")
+            return
+        listed = self.manifest.listed_ids()
+        unlisted = [
+            doc_id for batch in self.vector_store.iter_records(self.index_write_batch_size)
+            for doc_id in batch["ids"] if doc_id not in listed
+        ]
+        for start in range(0, len(unlisted), self.index_write_batch_size):
+            self.vector_store.delete(unlisted[start:start + self.index_write_batch_size])
+        if unlisted:
+            self.vector_store.persist()
+        if self.lexical_index is not None:
+            self.lexical_index.remove(unlisted)
+            self.lexical_index.save()
+        logger.info(f"Deleted {len(unlisted)} chunks not listed in the manifest")
+        del self.manifest.info["purge_unlisted"]
+        self.manifest.save()
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
     def get_embeddings(self, text: str) -> List[float]:
         """Get embeddings using nomic-embed-text-v1.5 consistently"""
+        embedding = self._lookup_embedding(text)
+        if embedding is not None:
+            return embedding
+        embedding = self._request_embedding(text)
+        self._remember_embedding(text, embedding)
+        return embedding
+
+    def _lookup_embedding(self, text: str) -> Optional[List[float]]:
+        """Check the in-memory memo, then the on-disk cache"""
+        embedding = self.embedding_memo.get(self.embedding_model, text)
+        if embedding is None and self.embedding_cache is not None:
+            embedding = self.embedding_cache.get(self.embedding_model, text)
+            if embedding is not None:
+                self.embedding_memo.put(self.embedding_model, text, embedding)
+        return embedding
+
+    def _remember_embedding(self, text: str, embedding: List[float]):
+        # Questions only go to the bounded memo; the on-disk cache holds chunks
+        self.embedding_memo.put(self.embedding_model, text, embedding)
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    def _request_embedding(self, text: str) -> List[float]:
+        """Request a single embedding from the embeddings endpoint"""
         try:
-            logger.info(f"Getting embedding for text of length {len(text)}")
-            response = requests.post(
-                f"{self.base_url}/v1/embeddings",
-                json={
-                    "model": "nomic-embed-text-v1.5",
-                    "input": text
-                }
-            )
-            response.raise_for_status()
+            logger.debug(f"Getting embedding for text of length {len(text)}")
+            with self.backends.request() as base_url:
+                response = self.session.post(
+                    f"{base_url}/v1/embeddings",
+                    json={
+                        "model": self.embedding_model,
+                        "input": text
+                    }
+                )
+                response.raise_for_status()
             embedding = response.json()["data"][0]["embedding"]
-            logger.info("Successfully got embedding")
+            logger.debug("Successfully got embedding")
             return embedding
         except Exception as e:
             logger.error(f"Embedding generation failed: {str(e)}")
             raise
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    def get_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        """Get embeddings for a list of texts in a single request"""
+        try:
+            with self.backends.request() as base_url:
+                response = self.session.post(
+                    f"{base_url}/v1/embeddings",
+                    json={
+                        "model": self.embedding_model,
+                        "input": texts
+                    }
+                )
+                response.raise_for_status()
+            data = response.json()["data"]
+            if len(data) != len(texts):
+                raise ValueError(f"Expected {len(texts)} embeddings, got {len(data)}")
+            # The API may return items out of order, so sort by index
+            data = sorted(data, key=lambda item: item.get("index", 0))
+            return [item["embedding"] for item in data]
+        except Exception as e:
+            logger.error(f"Batch embedding generation failed: {str(e)}")
+            raise
+
+    def embed_documents(
+        self,
+        chunks: List[str],
+        latencies: Optional[List[float]] = None
+    ) -> Tuple[List[str], List[List[float]]]:
+        """Embed chunks in batches with bounded parallelism.
+
+        Returns the chunks that were embedded successfully together with their
+        embeddings, in the original order. Chunks found in the embedding cache
+        are not sent to the network. Batches that fail after retries are
+        logged and dropped so the two lists always stay aligned. If latencies
+        is given, the duration of every successful batch request is appended.
+        """
+        cached: List[Optional[List[float]]] = [None] * len(chunks)
+        if self.embedding_cache is not None:
+            cached = self.embedding_cache.get_many(self.embedding_model, chunks)
+            logger.info(f"Found {sum(e is not None for e in cached)}/{len(chunks)} chunks in embedding cache")
+        missing = [chunk for chunk, embedding in zip(chunks, cached) if embedding is None]
         
-    def add_documents(self, file_path: str):
-        """Load and index documents with deduplication and better section preservation"""
+        batches = [
+            (start, missing[start:start + self.embed_batch_size])
+            for start in range(0, len(missing), self.embed_batch_size)
+        ]
+        logger.info(
+            f"Embedding {len(missing)} chunks in {len(batches)} batches "
+            f"(batch_size={self.embed_batch_size}, workers={self.embed_max_workers})"
+        )
+        
+        results: Dict[int, List[List[float]]] = {}
+        done_chunks = 0
+        start_time = time.time()
+        def embed_batch(batch: List[str]) -> List[List[float]]:
+            batch_start = time.perf_counter()
+            embeddings = self.get_embeddings_batch(batch)
+            if latencies is not None:
+                latencies.append(time.perf_counter() - batch_start)
+            return embeddings
+        
+        with ThreadPoolExecutor(max_workers=self.embed_max_workers) as executor:
+            futures = {
+                executor.submit(embed_batch, batch): (start, batch)
+                for start, batch in batches
+            }
+            for future in as_completed(futures):
+                start, batch = futures[future]
+                try:
+                    results[start] = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to embed chunks {start}-{start + len(batch) - 1}: {str(e)}")
+                    continue
+                if self.embedding_cache is not None:
+                    try:
+                        self.embedding_cache.put_many(self.embedding_model, batch, results[start])
+                    except ValueError as e:
+                        logger.warning(f"Not caching chunks {start}-{start + len(batch) - 1}: {str(e)}")
+                done_chunks += len(batch)
+                elapsed = time.time() - start_time
+                rate = done_chunks / elapsed if elapsed > 0 else 0.0
+                logger.info(
+                    f"Embedded {done_chunks}/{len(missing)} chunks "
+                    f"({len(results)}/{len(batches)} batches, {rate:.1f} chunks/s)"
+                )
+        
+        fresh: Dict[str, List[float]] = {}
+        for start, batch in batches:
+            if start in results:
+                fresh.update(zip(batch, results[start]))
+        
+        embedded_chunks = []
+        embeddings = []
+        for chunk, embedding in zip(chunks, cached):
+            if embedding is None:
+                embedding = fresh.get(chunk)
+            if embedding is not None:
+                embedded_chunks.append(chunk)
+                embeddings.append(embedding)
+        
+        elapsed = time.time() - start_time
+        logger.info(
+            f"Embedded {len(fresh)}/{len(missing)} new chunks in {elapsed:.1f}s "
+            f"({len(fresh) / elapsed if elapsed > 0 else 0.0:.1f} chunks/s)"
+        )
+        return embedded_chunks, embeddings
+        
+    def add_documents(self, path: str):
+        """Incrementally index a guideline file, or every file under a directory.
+
+        Files are chunked lazily and only chunks whose content-hash IDs are not
+        yet recorded in the manifest are embedded and upserted; chunks that
+        disappeared from a file are deleted. The manifest is checkpointed after
+        every write batch so an interrupted run resumes where it stopped.
+        """
         try:
-            logger.info(f"Starting document processing from: {file_path}")
+            logger.info(f"Starting document processing from: {path}")
             
             # Check if file exists
-            if not Path(file_path).exists():
-                logger.error(f"File not found: {file_path}")
+            if not Path(path).exists():
+                logger.error(f"File not found: {path}")
                 return
-                
-            # Get existing documents
-            existing_docs = set()
-            if self.collection.count() > 0:
-                existing_docs = set(self.collection.get()["documents"])
-                logger.info(f"Found {len(existing_docs)} existing documents")
-            
-            # Read and chunk new documents
-            with open(file_path, 'r', encoding='utf-8') as f:
-                text = f.read()
-                logger.info(f"Read {len(text)} bytes from file")
             
-            # Initialize variables for chunking
-            chunks = []
-            current_section = ""
-            current_subsection = ""
-            current_chunk = []
-            chunk_size = 0
-            MAX_CHUNK_SIZE = 1000  # Adjust as needed
-            
-            # Process line by line
-            lines = text.split('\n')
-            logger.info(f"Processing {len(lines)} lines")
+            files = list(iter_source_files(path))
+            self.index_progress["sources_total"] += len(files)
+            for file_path in files:
+                if self._stop_indexing.is_set():
+                    logger.warning(f"Indexing stopped before {file_path}")
+                    break
+                self.index_progress["current_source"] = file_path.as_posix()
+                self.index_chunks(
+                    file_path.as_posix(),
+                    iter_file_chunks(file_path, self.chunk_tokens, self.chunk_overlap_tokens)
+                )
+                self.index_progress["sources_done"] += 1
             
-            for line_num, line in enumerate(lines, 1):
-                line = line.strip()
-                if not line:
+        except Exception as e:
+            logger.error(f"Failed to add documents: {str(e)}")
+            logger.exception("Detailed error trace:")
+            raise
+        finally:
+            self.index_progress["current_source"] = None
+
+    def set_chunking(self, chunk_tokens: int, overlap_tokens: int):
+        """Chunk sources with these sizes from now on.
+
+        If the collection was built with other sizes, every source is marked
+        for re-indexing; chunks whose text is unchanged keep their IDs, so
+        only the chunks that actually differ are embedded again.
+        """
+        self.chunk_tokens = chunk_tokens
+        self.chunk_overlap_tokens = overlap_tokens
+        if self.manifest.set_chunking(chunk_tokens, overlap_tokens):
+            logger.warning(
+                f"Collection was built with other chunk sizes, re-indexing every source with "
+                f"chunk_tokens={chunk_tokens}, overlap_tokens={overlap_tokens}"
+            )
+
+    def stop_indexing(self):
+        """Ask a running ingestion to stop after its current write batch"""
+        self._stop_indexing.set()
+
+    def index_chunks(
+        self,
+        source: str,
+        chunks: Iterable[Chunk],
+        embed_latencies: Optional[List[float]] = None
+    ) -> Dict[str, int]:
+        """Bring the indexed chunks of one source file up to date.
+
+        chunks must be the complete chunking of the source. Returns counts of
+        chunks seen, new, added and deleted.
+        """
+        timer = StageTimer("ingest")
+        adopt_existing = not self.manifest.has_source(source)
+        indexed = self.manifest.indexed_ids(source)
+        seen: Dict[str, None] = {}  # Ordered set of the file's chunk IDs
+        
+        def new_chunks() -> Iterator[Tuple[str, Chunk]]:
+            for chunk in chunks:
+                doc_id = chunk_id(chunk.text)
+                if doc_id in seen:
                     continue
-                    
-                # Detect section headers
-                if line.startswith('# '):  # Main section
-                    logger.debug(f"Found main section at line {line_num}: {line[:50]}...")
-                    if current_chunk:
-                        chunk_text = f"{current_section}\n{current_subsection}\n{''.join(current_chunk)}"
-                        if chunk_text not in existing_docs:
-                            chunks.append(chunk_text)
-                            logger.debug(f"Added chunk with section: {current_section[:50]}...")
-                    current_section = line
-                    current_subsection = ""
-                    current_chunk = []
-                    chunk_size = 0
-                elif line.startswith('## '):  # Subsection
-                    logger.debug(f"Found subsection at line {line_num}: {line[:50]}...")
-                    if current_chunk:
-                        chunk_text = f"{current_section}\n{current_subsection}\n{''.join(current_chunk)}"
-                        if chunk_text not in existing_docs:
-                            chunks.append(chunk_text)
-                            logger.debug(f"Added chunk with subsection: {current_subsection[:50]}...")
-                    current_subsection = line
-                    current_chunk = []
-                    chunk_size = 0
-                else:
-                    # Add line to current chunk
-                    current_chunk.append(line + '\n')
-                    chunk_size += len(line)
-                    
-                    # If chunk size exceeds limit, save it and start new chunk
-                    if chunk_size >= MAX_CHUNK_SIZE:
-                        chunk_text = f"{current_section}\n{current_subsection}\n{''.join(current_chunk)}"
-                        if chunk_text not in existing_docs:
-                            chunks.append(chunk_text)
-                            logger.debug(f"Added chunk due to size limit: {chunk_size} bytes")
-                        current_chunk = []
-                        chunk_size = 0
+                seen[doc_id] = None
+                if self.lexical_index is not None:
+                    self.lexical_index.add([doc_id], [chunk.text])
+                if doc_id not in indexed:
+                    yield doc_id, chunk
+        
+        # Embed and upsert new chunks, checkpointing after every batch
+        num_new = 0
+        added = 0
+        for batch in batched(new_chunks(), self.index_write_batch_size):
+            if self._stop_indexing.is_set():
+                break
+            if adopt_existing:
+                # Adopt chunks that are already stored but were never recorded
+                existing = self.vector_store.existing_ids([doc_id for doc_id, _ in batch])
+                if existing:
+                    self.manifest.mark_indexed(source, [doc_id for doc_id, _ in batch if doc_id in existing])
+                    batch = [(doc_id, chunk) for doc_id, chunk in batch if doc_id not in existing]
+                if not batch:
+                    continue
+            num_new += len(batch)
             
-            # Add final chunk if exists
-            if current_chunk:
-                chunk_text = f"{current_section}\n{current_subsection}\n{''.join(current_chunk)}"
-                if chunk_text not in existing_docs:
-                    chunks.append(chunk_text)
-                    logger.debug("Added final chunk")
+            chunks_by_text = {chunk.text: chunk for _, chunk in batch}
+            with timer.stage("embed"):
+                texts, embeddings = self.embed_documents(list(chunks_by_text), embed_latencies)
+            if not embeddings:
+                logger.error("No embeddings were generated successfully")
+                continue
+            batch_ids = [chunk_id(text) for text in texts]
+            with timer.stage("store"):
+                self.vector_store.upsert(
+                    ids=batch_ids,
+                    embeddings=embeddings,
+                    documents=texts,
+                    metadatas=[
+                        {
+                            "source": source,
+                            "section": chunks_by_text[text].section,
+                            "subsection": chunks_by_text[text].subsection
+                        }
+                        for text in texts
+                    ]
+                )
+                self.vector_store.persist()
+                self.manifest.mark_indexed(source, batch_ids)
+            added += len(batch_ids)
+            self.index_progress["chunks_added"] += len(batch_ids)
+            logger.info(f"Indexed {added}/{num_new} new chunks from {source}")
+        
+        ids = list(seen)
+        stats = {"chunks": len(ids), "new": num_new, "added": added, "deleted": 0}
+        logger.info(f"{source}: {len(ids)} chunks, {num_new} new")
+        if added < num_new:
+            logger.error(f"Indexed only {added}/{num_new} new chunks, leaving {source} for resume")
+            return stats
+        if self._stop_indexing.is_set():
+            logger.warning(f"Indexing stopped, leaving {source} for resume")
+            return stats
+        
+        # Remove chunks from sections that changed or were deleted, unless
+        # another source still lists the same text
+        stale = sorted(self.manifest.indexed_ids(source) - set(ids) - self.manifest.listed_ids(exclude=source))
+        with timer.stage("delete"):
+            for start in range(0, len(stale), self.index_write_batch_size):
+                self.vector_store.delete(stale[start:start + self.index_write_batch_size])
+            if stale:
+                self.vector_store.persist()
+                logger.info(f"Deleted {len(stale)} stale chunks")
+        
+        self.manifest.mark_complete(source, ids)
+        
+        if self.lexical_index is not None:
+            with timer.stage("lexical"):
+                self.lexical_index.remove(stale)
+                self.lexical_index.save()
+        logger.info(f"Finished indexing {source}: {len(ids)} chunks in collection, timings {timer.as_metadata()}")
+        stats["deleted"] = len(stale)
+        return stats
+
+    def _num_candidates(self) -> int:
+        """Number of chunks to fetch from the vector store before selection"""
+        candidates = self.n_results
+        if self.lexical_index is not None:
+            candidates = max(candidates, self.hybrid_candidates)
+        if self.context_selection:
+            candidates = max(candidates, self.context_candidates)
+        return candidates
+
+    def _rank_candidates(
+        self,
+        question: str,
+        embedding: List[float],
+        results: Dict[str, Any]
+    ) -> Tuple[List[str], List[float], Dict[str, str], Dict[str, Any]]:
+        """Rank candidate chunks for a question from vector search results.
+
+        With hybrid search enabled, the vector ranking is fused with a BM25
+        ranking by reciprocal-rank fusion so exact drug names, doses and codes
+        are not missed. Returns the ranked IDs, their scores (higher is
+        better) and the documents and embeddings known so far by ID.
+        """
+        ids = results["ids"][0] if results.get("ids") else []
+        documents = results["documents"][0] if results.get("documents") else []
+        embeddings = results["embeddings"][0] if results.get("embeddings") else [None] * len(ids)
+        docs_by_id = dict(zip(ids, documents))
+        embeddings_by_id = dict(zip(ids, embeddings))
+        
+        if self.lexical_index is None:
+            if self.context_selection and ids:
+                scores = cosine_similarities(embedding, embeddings).tolist()
+            else:
+                scores = [1.0 / rank for rank in range(1, len(ids) + 1)]
+            return ids, scores, docs_by_id, embeddings_by_id
+        
+        lexical_ids = [doc_id for doc_id, _ in self.lexical_index.search(question, self.hybrid_candidates)]
+        fused = reciprocal_rank_fusion([ids, lexical_ids], k=settings.RRF_K)
+        fused = fused[:self.context_candidates if self.context_selection else self.n_results]
+        for doc_id, _ in fused:
+            if doc_id not in docs_by_id:
+                docs_by_id[doc_id] = self.lexical_index.document(doc_id)
+        return [doc_id for doc_id, _ in fused], [score for _, score in fused], docs_by_id, embeddings_by_id
+
+    def _missing_embeddings(self, ranked_ids: List[str], embeddings_by_id: Dict[str, Any]) -> List[str]:
+        """IDs that need their embeddings fetched before MMR can run"""
+        if not self.context_selection:
+            return []
+        return [doc_id for doc_id in ranked_ids if embeddings_by_id.get(doc_id) is None]
+
+    def _select_documents(
+        self,
+        embedding: List[float],
+        ranked_ids: List[str],
+        scores: List[float],
+        docs_by_id: Dict[str, str],
+        embeddings_by_id: Dict[str, Any]
+    ) -> List[str]:
+        """Pick the chunks that go into the prompt, in prompt order.
+
+        With context selection enabled, the ranked candidates are ordered by
+        MMR over their retrieval scores and cut off by token budget and by
+        relevance gap, where relevance is the question-chunk cosine
+        similarity (fused RRF scores are rank-based, so they only order
+        candidates); otherwise the top RETRIEVAL_N_RESULTS chunks are used as
+        ranked.
+        """
+        if not self.context_selection:
+            return [docs_by_id[i] for i in ranked_ids[:self.n_results] if docs_by_id.get(i)]
+
+        pool = [
+            (doc_id, score) for doc_id, score in zip(ranked_ids, scores)
+            if docs_by_id.get(doc_id) and embeddings_by_id.get(doc_id) is not None
+        ]
+        if not pool:
+            return []
+        documents = [docs_by_id[doc_id] for doc_id, _ in pool]
+        pool_embeddings = [embeddings_by_id[doc_id] for doc_id, _ in pool]
+        chosen = select_context(
+            documents,
+            pool_embeddings,
+            cosine_similarities(embedding, pool_embeddings).tolist(),
+            max_chunks=self.n_results,
+            lambda_mult=settings.MMR_LAMBDA,
+            max_relevance_gap=settings.CONTEXT_MAX_RELEVANCE_GAP,
+            token_budget=settings.CONTEXT_TOKEN_BUDGET,
+            ranking_scores=[score for _, score in pool]
+        )
+        return [documents[index] for index in chosen]
+
+    def retrieve_documents(self, question: str, embedding: List[float]) -> List[str]:
+        """Return the context chunks retrieved for a question embedding"""
+        results = self.vector_store.query(
+            query_embeddings=[embedding],
+            n_results=self._num_candidates(),
+            include_embeddings=self.context_selection
+        )
+        ranked_ids, scores, docs_by_id, embeddings_by_id = self._rank_candidates(question, embedding, results)
+        missing = self._missing_embeddings(ranked_ids, embeddings_by_id)
+        if missing:
+            fetched = self.vector_store.get(missing)
+            embeddings_by_id.update(zip(fetched["ids"], fetched["embeddings"]))
+        return self._select_documents(embedding, ranked_ids, scores, docs_by_id, embeddings_by_id)
+
+    def _format_context(self, question: str, documents: List[str]) -> str:
+        """Join the selected chunks, keeping only question-relevant sentences if enabled"""
+        if self.context_compression:
+            return compress_context(question, documents, settings.CONTEXT_COMPRESSION_TOKEN_BUDGET)
+        return "\n".join(documents)
+
+    def _retrieve(self, question: str, embedding: List[float]) -> str:
+        """Return the context retrieved for a question embedding"""
+        return self._format_context(question, self.retrieve_documents(question, embedding))
+
+    def _build_messages(
+        self,
+        question: str,
+        context: str,
+        chat_history: Optional[List[Dict[str, str]]] = None
+    ) -> List[Dict[str, str]]:
+        """Assemble the chat messages for a question, its retrieved context and
+        the most recent conversation that fits CHAT_HISTORY_TOKEN_BUDGET"""
+        logger.debug(f"Context:\n{context}")
+        history = trim_history(chat_history, settings.CHAT_HISTORY_TOKEN_BUDGET) if chat_history else []
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "system", "content": f"Context:\n{context}"},
+            *history,
+            {"role": "user", "content": question}
+        ]
+
+    def _build_metadata(self, temperature: float, context: str, timer: Optional[StageTimer] = None) -> Dict[str, Any]:
+        metadata = {
+            "model": self.model_type,
+            "temperature": temperature,
+            "timestamp": time.time(),
+            "context_used": bool(context),
+            "context": context
+        }
+        if timer is not None:
+            metadata["timings"] = timer.as_metadata()
+        return metadata
+
+    def _build_response(
+        self,
+        content: str,
+        temperature: float,
+        context: str,
+        timer: Optional[StageTimer] = None,
+        completion_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
+        metadata = self._build_metadata(temperature, context, timer)
+        if timer is not None:
+            metadata.update(self._generation_stats(timer, completion_tokens))
+        return {
+            "response": content,
+            "metadata": metadata
+        }
+
+    def _generation_stats(self, timer: StageTimer, completion_tokens: Optional[int]) -> Dict[str, Any]:
+        """Completion token count and generation speed, also fed to /metrics"""
+        generate_seconds = timer.timings.get("generate")
+        tokens_per_second = None
+        if completion_tokens and generate_seconds:
+            tokens_per_second = round(completion_tokens / generate_seconds, 1)
+            TOKENS_PER_SECOND.observe(tokens_per_second, model=self.model_name)
+        return {"completion_tokens": completion_tokens, "tokens_per_second": tokens_per_second}
+
+    def _cached_answer(
+        self,
+        embedding: List[float],
+        chat_history: Optional[List[Dict[str, str]]],
+        temperature: float,
+        max_tokens: int,
+        timer: Optional[StageTimer] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Return a cached answer for a similar question, if caching applies"""
+        if self.answer_cache is None or chat_history:
+            return None
+        cached = self.answer_cache.get((self.model_name, temperature, max_tokens), embedding)
+        if cached is not None:
+            cached["metadata"]["timestamp"] = time.time()
+            cached["metadata"]["cache_hit"] = True
+            if timer is not None:
+                cached["metadata"]["timings"] = timer.as_metadata()
+        return cached
+
+    def _store_answer(
+        self,
+        embedding: List[float],
+        chat_history: Optional[List[Dict[str, str]]],
+        temperature: float,
+        max_tokens: int,
+        response: Dict[str, Any]
+    ):
+        if self.answer_cache is None or chat_history:
+            return
+        self.answer_cache.put((self.model_name, temperature, max_tokens), embedding, response)
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    def query(
+        self,
+        question: str,
+        chat_history: List[Dict[str,str]]=None,
+        temperature: float = 0.3,
+        max_tokens: int = 2000
+    ) -> Dict[str, Any]:
+        """Query with retry logic"""
+        try:
+            timer = StageTimer("query")
+            with timer.stage("embed"):
+                embedding = self.get_embeddings(question)
+            cached = self._cached_answer(embedding, chat_history, temperature, max_tokens, timer)
+            if cached is not None:
+                return cached
             
-            logger.info(f"Created {len(chunks)} chunks for processing")
+            # Get relevant context
+            with timer.stage("retrieve"):
+                context = self._retrieve(question, embedding)
             
-            if not chunks:
-                logger.info("No new documents to add")
-                return
+            # Prepare messages
+            with timer.stage("prompt_build"):
+                messages = self._build_messages(question, context, chat_history)
             
-            # Generate embeddings for new chunks
-            embeddings = []
-            for i, chunk in enumerate(chunks, 1):
-                try:
-                    logger.debug(f"Generating embedding for chunk {i}/{len(chunks)}")
-                    embedding = self.get_embeddings(chunk)
-                    embeddings.append(embedding)
-                    logger.debug(f"Successfully generated embedding {i}/{len(chunks)}")
-                except Exception as e:
-                    logger.error(f"Failed to generate embedding for chunk {i}: {str(e)}")
-                    continue
+            # Get completion based on model type
+            with timer.stage("generate"):
+                if self.model_type == "lmstudio":
+                    with self.backends.request() as base_url:
+                        response = self.session.post(
+                            f"{base_url}/v1/chat/completions",
+                            json={
+                                "messages": messages,
+                                "temperature": temperature,
+                                "max_tokens": max_tokens,
+                                "stream": False
+                            }
+                        )
+                        response.raise_for_status()
+                    result = response.json()
+                    content = result["choices"][0]["message"]["content"]
+                    completion_tokens = (result.get("usage") or {}).get("completion_tokens")
+                else:
+                    response = self.openai_client.chat.completions.create(
+                        model=self.model_name,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens
+                    )
+                    content = response.choices[0].message.content
+                    completion_tokens = response.usage.completion_tokens if response.usage else None
             
-            if not embeddings:
-                logger.error("No embeddings were generated successfully")
-                return
-                
-            logger.info(f"Generated {len(embeddings)} embeddings successfully")
+            result = self._build_response(content, temperature, context, timer, completion_tokens)
+            self._store_answer(embedding, chat_history, temperature, max_tokens, result)
+            return result
             
-            # Add new documents to collection
-            self.collection.add(
-                embeddings=embeddings,
-                documents=chunks,
-                ids=[f"doc_{i}" for i in range(len(chunks))]
+        except Exception as e:
+            logger.error(f"Query failed: {str(e)}")
+            raise
+
+    def _get_async_http(self) -> httpx.AsyncClient:
+        if self._async_http is None:
+            self._async_http = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.LLM_REQUEST_TIMEOUT),
+                limits=httpx.Limits(max_connections=settings.ASYNC_HTTP_MAX_CONNECTIONS)
             )
-            logger.info(f"Added {len(chunks)} new documents to ChromaDB")
-            
+        return self._async_http
+
+    async def aget_embeddings(self, text: str) -> List[float]:
+        """Async version of get_embeddings"""
+        embedding = self._lookup_embedding(text)
+        if embedding is not None:
+            return embedding
+        if self.embedding_batcher is not None:
+            embedding = await self.embedding_batcher.embed(text)
+        else:
+            embedding = await self._arequest_embedding(text)
+        self._remember_embedding(text, embedding)
+        return embedding
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    async def _arequest_embedding(self, text: str) -> List[float]:
+        try:
+            with self.backends.request() as base_url:
+                response = await self._get_async_http().post(
+                    f"{base_url}/v1/embeddings",
+                    json={
+                        "model": self.embedding_model,
+                        "input": text
+                    }
+                )
+                response.raise_for_status()
+            return response.json()["data"][0]["embedding"]
         except Exception as e:
-            logger.error(f"Failed to add documents: {str(e)}")
-            logger.exception("Detailed error trace:")
+            logger.error(f"Embedding generation failed: {str(e)}")
             raise
+
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    def query(
+    async def _arequest_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        try:
+            with self.backends.request() as base_url:
+                response = await self._get_async_http().post(
+                    f"{base_url}/v1/embeddings",
+                    json={
+                        "model": self.embedding_model,
+                        "input": texts
+                    }
+                )
+                response.raise_for_status()
+            data = sorted(response.json()["data"], key=lambda item: item.get("index", 0))
+            if len(data) != len(texts):
+                raise ValueError(f"Expected {len(texts)} embeddings, got {len(data)}")
+            return [item["embedding"] for item in data]
+        except Exception as e:
+            logger.error(f"Batch embedding generation failed: {str(e)}")
+            raise
+
+    async def aget_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed many questions, sending every memo miss in one request"""
+        embeddings = [self._lookup_embedding(text) for text in texts]
+        missing = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+        if missing:
+            fetched = dict(zip(missing, await self._arequest_embeddings_batch(missing)))
+            for text, embedding in fetched.items():
+                self._remember_embedding(text, embedding)
+            embeddings = [embedding if embedding is not None else fetched[text] for text, embedding in zip(texts, embeddings)]
+        return embeddings
+
+    async def _aretrieve(self, question: str, embedding: List[float]) -> str:
+        """Async version of _retrieve"""
+        return (await self.aretrieve_contexts([question], [embedding]))[0]
+
+    async def aretrieve_contexts(self, questions: List[str], embeddings: List[List[float]]) -> List[str]:
+        """Retrieve the joined context for many questions with one vector store query"""
+        results = await self.vector_store.aquery(
+            query_embeddings=embeddings,
+            n_results=self._num_candidates(),
+            include_embeddings=self.context_selection
+        )
+        # Split the per-query rows back into single-query results
+        keys = [key for key in ("ids", "documents", "metadatas", "distances", "embeddings") if results.get(key)]
+        ranked = [
+            self._rank_candidates(question, embedding, {key: [results[key][i]] for key in keys})
+            for i, (question, embedding) in enumerate(zip(questions, embeddings))
+        ]
+        missing = list(dict.fromkeys(
+            doc_id for ranked_ids, _, _, embeddings_by_id in ranked
+            for doc_id in self._missing_embeddings(ranked_ids, embeddings_by_id)
+        ))
+        if missing:
+            fetched = await self.vector_store.aget(missing)
+            fetched_by_id = dict(zip(fetched["ids"], fetched["embeddings"]))
+            for ranked_ids, _, _, embeddings_by_id in ranked:
+                embeddings_by_id.update((i, fetched_by_id[i]) for i in ranked_ids if i in fetched_by_id)
+        return [
+            self._format_context(question, self._select_documents(embedding, *candidates))
+            for question, embedding, candidates in zip(questions, embeddings, ranked)
+        ]
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    async def aquery(
         self,
         question: str,
         chat_history: List[Dict[str,str]]=None,
         temperature: float = 0.3,
         max_tokens: int = 2000
     ) -> Dict[str, Any]:
-        """Query with retry logic"""
+        """Async version of query that never blocks the event loop"""
         try:
-            # Get relevant context
-            results = self.collection.query(
-                query_embeddings=[self.get_embeddings(question)],
-                n_results=4 # increase number of context chunks, tried 2, not so good.
-            )
+            timer = StageTimer("query")
+            with timer.stage("embed"):
+                embedding = await self.aget_embeddings(question)
+            cached = self._cached_answer(embedding, chat_history, temperature, max_tokens, timer)
+            if cached is not None:
+                return cached
             
-            context = "\n".join(results['documents'][0]) if results['documents'] else ""
+            # Get relevant context
+            with timer.stage("retrieve"):
+                context = await self._aretrieve(question, embedding)
             
             # Prepare messages
-            messages = [
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "system", "content": f"Context:\n{context}"},
-                {"role": "user", "content": question}
-            ]
-            print(context)
+            with timer.stage("prompt_build"):
+                messages = self._build_messages(question, context, chat_history)
             
             # Get completion based on model type
-            if self.model_type == "lmstudio":
-                response = requests.post(
-                    f"{self.base_url}/v1/chat/completions",
+            with timer.stage("generate"):
+                content, completion_tokens = await self._acomplete(messages, temperature, max_tokens)
+            
+            result = self._build_response(content, temperature, context, timer, completion_tokens)
+            self._store_answer(embedding, chat_history, temperature, max_tokens, result)
+            return result
+            
+        except Exception as e:
+            logger.error(f"Query failed: {str(e)}")
+            raise
+
+    async def _acomplete(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int
+    ) -> Tuple[str, Optional[int]]:
+        """Run one chat completion, returning its text and completion token count"""
+        if self.model_type == "lmstudio":
+            with self.backends.request() as base_url:
+                response = await self._get_async_http().post(
+                    f"{base_url}/v1/chat/completions",
                     json={
                         "messages": messages,
                         "temperature": temperature,
@@ -239,28 +979,164 @@ class LLMClient:
                     }
                 )
                 response.raise_for_status()
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
-            else:
-                response = self.openai_client.chat.completions.create(
-                    model=self.model_name,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=max_tokens
-                )
-                content = response.choices[0].message.content
-            
-            return {
-                "response": content,
-                "metadata": {
-                    "model": self.model_type,
-                    "temperature": temperature,
-                    "timestamp": time.time(),
-                    "context_used": bool(context),
-                    "context": context
-                }
+            result = response.json()
+            return result["choices"][0]["message"]["content"], (result.get("usage") or {}).get("completion_tokens")
+        
+        response = await self.async_openai_client.chat.completions.create(
+            model=self.model_name,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        return response.choices[0].message.content, response.usage.completion_tokens if response.usage else None
+
+    async def asummarize(self, summary: str, turns: str, max_tokens: int = 300) -> str:
+        """Fold conversation turns into a rolling summary of about max_tokens"""
+        messages = [{
+            "role": "user",
+            "content": SUMMARY_PROMPT.format(max_words=int(max_tokens * 0.75), summary=summary or "(none)", turns=turns)
+        }]
+        content, _ = await self._acomplete(messages, temperature=0.0, max_tokens=max_tokens)
+        return content
+
+    async def aretrieve_context(self, question: str) -> str:
+        """Embed a question and return its joined context, for reuse across generations"""
+        embedding = await self.aget_embeddings(question)
+        return await self._aretrieve(question, embedding)
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    async def agenerate(
+        self,
+        question: str,
+        context: str,
+        temperature: float = 0.3,
+        max_tokens: int = 2000,
+        embedding: Optional[List[float]] = None
+    ) -> Dict[str, Any]:
+        """Answer a question from already retrieved context.
+
+        Skips embedding and retrieval. The answer cache is only used when the
+        question embedding is given, so without it repeated calls give
+        independent samples over the same context.
+        """
+        timer = StageTimer("generate")
+        if embedding is not None:
+            cached = self._cached_answer(embedding, None, temperature, max_tokens, timer)
+            if cached is not None:
+                return cached
+        with timer.stage("prompt_build"):
+            messages = self._build_messages(question, context)
+        with timer.stage("generate"):
+            content, completion_tokens = await self._acomplete(messages, temperature, max_tokens)
+        result = self._build_response(content, temperature, context, timer, completion_tokens)
+        if embedding is not None:
+            self._store_answer(embedding, None, temperature, max_tokens, result)
+        return result
+
+    async def astream_query(
+        self,
+        question: str,
+        chat_history: List[Dict[str,str]]=None,
+        temperature: float = 0.3,
+        max_tokens: int = 2000
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a query as events.
+
+        Yields a ``metadata`` event with the retrieved context before generation
+        starts, one ``token`` event per generated text delta, and a final
+        ``done`` event with stage timings. Streaming is not retried once tokens
+        have been sent.
+        """
+        start_time = time.time()
+        timer = StageTimer("stream")
+        with timer.stage("embed"):
+            embedding = await self.aget_embeddings(question)
+        cached = self._cached_answer(embedding, chat_history, temperature, max_tokens, timer)
+        if cached is not None:
+            yield {"event": "metadata", "data": cached["metadata"]}
+            yield {"event": "token", "data": {"content": cached["response"]}}
+            yield {
+                "event": "done",
+                "data": {"time_to_first_token": round(time.time() - start_time, 3), "tokens": 1}
             }
-            
-        except Exception as e:
-            logger.error(f"Query failed: {str(e)}")
-            raise
+            return
+        
+        with timer.stage("retrieve"):
+            context = await self._aretrieve(question, embedding)
+        with timer.stage("prompt_build"):
+            messages = self._build_messages(question, context, chat_history)
+        metadata = self._build_metadata(temperature, context, timer)
+        yield {"event": "metadata", "data": metadata}
+        
+        generate_start = time.perf_counter()
+        first_token_time = None
+        num_tokens = 0
+        parts: List[str] = []
+        if self.model_type == "lmstudio":
+            with self.backends.request() as base_url:
+                async with self._get_async_http().stream(
+                    "POST",
+                    f"{base_url}/v1/chat/completions",
+                    json={
+                        "messages": messages,
+                        "temperature": temperature,
+                        "max_tokens": max_tokens,
+                        "stream": True
+                    }
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        payload = line[len("data:"):].strip()
+                        if payload == "[DONE]":
+                            break
+                        choices = json.loads(payload).get("choices") or [{}]
+                        delta = (choices[0].get("delta") or {}).get("content")
+                        if delta:
+                            first_token_time = first_token_time or time.time()
+                            num_tokens += 1
+                            parts.append(delta)
+                            yield {"event": "token", "data": {"content": delta}}
+        else:
+            stream = await self.async_openai_client.chat.completions.create(
+                model=self.model_name,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    first_token_time = first_token_time or time.time()
+                    num_tokens += 1
+                    parts.append(delta)
+                    yield {"event": "token", "data": {"content": delta}}
+        
+        timer.record("generate", time.perf_counter() - generate_start)
+        
+        self._store_answer(
+            embedding, chat_history, temperature, max_tokens,
+            {"response": "".join(parts), "metadata": metadata}
+        )
+        yield {
+            "event": "done",
+            "data": {
+                "time_to_first_token": round(first_token_time - start_time, 3) if first_token_time else None,
+                "tokens": num_tokens,
+                "timings": timer.as_metadata(),
+                # Each streamed delta is about one token
+                "tokens_per_second": self._generation_stats(timer, num_tokens)["tokens_per_second"]
+            }
+        }
+
+    async def aclose(self):
+        """Close the pooled async HTTP clients"""
+        if self._async_http is not None:
+            await self._async_http.aclose()
+            self._async_http = None
+        if hasattr(self, "async_openai_client"):
+            await self.async_openai_client.close()
+            # Fresh client so this LLMClient still works from a later event loop
+            self.async_openai_client = AsyncOpenAI(api_key=self.openai_client.api_key)
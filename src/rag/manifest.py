@@ -0,0 +1,137 @@
+# src/rag/manifest.py
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from src.logger import setup_logger
+from src.rag.file_lock import exclusive_lock
+
+logger = setup_logger("manifest")
+
+
+def chunk_id(text: str) -> str:
+    """Stable content-hash ID for a chunk"""
+    return "chunk_" + hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+class IndexManifest:
+    """Record of which chunk IDs from each source file are in a collection.
+
+    One manifest file can track several collections (e.g. the same corpus in
+    different vector store backends), each under its own name. Besides the
+    sources, each collection has an ``info`` dict for collection-wide state.
+    The same chunk ID may be listed by several sources when they share text.
+
+    The manifest is rewritten atomically after every write batch, so it doubles
+    as the ingestion checkpoint: a run that stops halfway leaves the source
+    marked incomplete with the IDs that were already stored. Saves hold a lock
+    file and merge with the manifest on disk, so processes indexing different
+    sources (e.g. ``src.ingest`` next to the API) keep each other's entries.
+    """
+
+    def __init__(self, path: str, collection_name: str):
+        self.path = Path(path)
+        self.collection_name = collection_name
+        self.sources: Dict[str, Dict] = {}
+        self.info: Dict[str, Any] = {}
+        self.tracked = False  # Whether the manifest already had this collection
+        self.lock_path = self.path.with_suffix(self.path.suffix + ".lock")
+        self._changed: Set[str] = set()  # Sources modified since the last save
+        self._replace = False  # Drop the sources on disk at the next save
+        self._load()
+
+    def _read(self) -> Dict:
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.error(f"Ignoring unreadable manifest {self.path}: {str(e)}")
+            return {}
+
+    def _load(self):
+        collections = self._read().get("collections", {})
+        entry = collections.get(self.collection_name, {})
+        self.sources = entry.get("sources", {})
+        self.info = entry.get("info", {})
+        self.tracked = self.collection_name in collections
+
+    def save(self):
+        """Atomically write the manifest to disk.
+
+        Under the lock the file is read again: sources changed here since the
+        last save replace their entries, while other sources and collections
+        are kept as found and loaded into this manifest. The collection info
+        is written as this process has it.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with exclusive_lock(self.lock_path):
+            data = self._read()
+            collections = data.setdefault("collections", {})
+            sources = {} if self._replace else collections.get(self.collection_name, {}).get("sources", {})
+            sources.update((source, self.sources[source]) for source in self._changed if source in self.sources)
+            collections[self.collection_name] = {"sources": sources, "info": self.info}
+            tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        self.sources = sources
+        self._changed.clear()
+        self._replace = False
+
+    def reset(self):
+        self.sources = {}
+        self.info = {}
+        self._changed.clear()
+        self._replace = True
+        self.save()
+
+    def indexed_ids(self, source: str) -> Set[str]:
+        return set(self.sources.get(source, {}).get("chunk_ids", []))
+
+    def listed_ids(self, exclude: Optional[str] = None) -> Set[str]:
+        """Chunk IDs listed by any source other than exclude"""
+        return {
+            doc_id for source, entry in self.sources.items() if source != exclude
+            for doc_id in entry.get("chunk_ids", [])
+        }
+
+    def has_source(self, source: str) -> bool:
+        return source in self.sources
+
+    def incomplete_sources(self) -> List[str]:
+        return [source for source, entry in self.sources.items() if not entry.get("complete", False)]
+
+    def set_chunking(self, chunk_tokens: int, overlap_tokens: int) -> bool:
+        """Record the chunk sizes the collection is built with.
+
+        If they differ from the recorded ones (or none were recorded), every
+        source is marked incomplete so it gets re-chunked and re-indexed.
+        Returns whether that happened.
+        """
+        chunking = {"chunk_tokens": chunk_tokens, "overlap_tokens": overlap_tokens}
+        if all(self.info.get(key) == value for key, value in chunking.items()):
+            return False
+        for entry in self.sources.values():
+            entry["complete"] = False
+        self._changed.update(self.sources)
+        self.info.update(chunking)
+        self.save()
+        return bool(self.sources)
+
+    def mark_indexed(self, source: str, ids: Iterable[str]):
+        """Checkpoint IDs that are now stored for source"""
+        entry = self.sources.setdefault(source, {"chunk_ids": [], "complete": False})
+        known = set(entry["chunk_ids"])
+        entry["chunk_ids"].extend(i for i in ids if i not in known)
+        entry["complete"] = False
+        self._changed.add(source)
+        self.save()
+
+    def mark_complete(self, source: str, ids: List[str]):
+        """Replace the IDs for source with its final set once ingestion finishes"""
+        self.sources[source] = {"chunk_ids": list(ids), "complete": True}
+        self._changed.add(source)
+        self.save()
@@ -0,0 +1,151 @@
+# src/rag/session_memory.py
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from src.logger import setup_logger
+from src.rag.context import estimate_tokens
+
+logger = setup_logger("session_memory")
+
+SummarizeFn = Callable[[str, str], Awaitable[str]]  # (previous summary, turns to fold) -> new summary
+
+# (role, content, estimated tokens)
+Message = Tuple[str, str, int]
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def trim_history(chat_history: List[Dict[str, str]], token_budget: int) -> List[Dict[str, str]]:
+    """Keep the most recent messages that fit in token_budget.
+
+    System messages (a conversation summary) are always kept and count
+    against the budget first, so the result never grows with history length.
+    """
+    system = [message for message in chat_history if message.get("role") == "system"]
+    budget = token_budget - sum(estimate_tokens(message["content"]) for message in system)
+    recent: List[Dict[str, str]] = []
+    for message in reversed([m for m in chat_history if m.get("role") != "system"]):
+        tokens = estimate_tokens(message["content"])
+        if tokens > budget:
+            break
+        recent.append(message)
+        budget -= tokens
+    return system + recent[::-1]
+
+
+class Session:
+    __slots__ = ("recent", "recent_tokens", "summary", "pending", "summarizing", "last_used")
+
+    def __init__(self):
+        self.recent: Deque[Message] = deque()
+        self.recent_tokens = 0
+        self.summary = ""
+        self.pending: List[Message] = []  # Turns pushed out of recent, not yet summarized
+        self.summarizing = False
+        self.last_used = time.time()
+
+
+class SessionStore:
+    """Server-side conversation memory with a fixed prompt footprint.
+
+    Each session keeps its most recent messages verbatim up to
+    ``recent_token_budget``. Older messages are folded into a rolling summary
+    of at most ``summary_token_budget`` tokens by ``summarize``, which runs as
+    a background task after the answer has been returned; until it finishes
+    the previous summary is used. The history sent with a question is
+    therefore bounded by the two budgets however long the conversation runs.
+    Sessions expire after ``ttl_seconds`` idle and the least recently used is
+    evicted beyond ``max_sessions``.
+    """
+
+    def __init__(
+        self,
+        recent_token_budget: int = 1000,
+        summary_token_budget: int = 300,
+        max_sessions: int = 1000,
+        ttl_seconds: float = 3600
+    ):
+        self.recent_token_budget = recent_token_budget
+        self.summary_token_budget = summary_token_budget
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+        self.summaries = 0
+        self.summary_failures = 0
+        self.evictions = 0
+
+    def _get(self, session_id: str, create: bool = False) -> Optional[Session]:
+        now = time.time()
+        expired = [sid for sid, s in self._sessions.items() if now - s.last_used > self.ttl_seconds]
+        for sid in expired:
+            del self._sessions[sid]
+        self.evictions += len(expired)
+        session = self._sessions.get(session_id)
+        if session is None and create:
+            session = self._sessions[session_id] = Session()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+        if session is not None:
+            session.last_used = now
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def history(self, session_id: str) -> List[Dict[str, str]]:
+        """Chat history for the next question: the summary, then recent turns"""
+        session = self._get(session_id)
+        if session is None:
+            return []
+        messages = [{"role": "system", "content": SUMMARY_PREFIX + session.summary}] if session.summary else []
+        return messages + [{"role": role, "content": content} for role, content, _ in session.recent]
+
+    def append(self, session_id: str, question: str, answer: str, summarize: SummarizeFn):
+        """Record a finished turn, scheduling a summary if older turns overflow"""
+        session = self._get(session_id, create=True)
+        for role, content in (("user", question), ("assistant", answer)):
+            tokens = estimate_tokens(content)
+            session.recent.append((role, content, tokens))
+            session.recent_tokens += tokens
+        while session.recent and session.recent_tokens > self.recent_token_budget:
+            message = session.recent.popleft()
+            session.recent_tokens -= message[2]
+            session.pending.append(message)
+        if session.pending and not session.summarizing:
+            session.summarizing = True
+            task = asyncio.get_running_loop().create_task(self._summarize(session_id, session, summarize))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _summarize(self, session_id: str, session: Session, summarize: SummarizeFn):
+        try:
+            while session.pending:
+                batch, session.pending = session.pending, []
+                turns = "\n".join(f"{role}: {content}" for role, content, _ in batch)
+                try:
+                    summary = (await summarize(session.summary, turns)).strip()
+                    # Hold the budget even if the model overruns its limit
+                    session.summary = summary[:self.summary_token_budget * 4]
+                    self.summaries += 1
+                except Exception as e:
+                    # Retry with the next turn; meanwhile the old summary stays in use
+                    self.summary_failures += 1
+                    session.pending = batch + session.pending
+                    pending_tokens = sum(message[2] for message in session.pending)
+                    while len(session.pending) > 1 and pending_tokens > self.recent_token_budget:
+                        pending_tokens -= session.pending.pop(0)[2]
+                    logger.warning(f"Summarizing session {session_id} failed: {str(e)}")
+                    break
+        finally:
+            session.summarizing = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._sessions),
+            "summaries": self.summaries,
+            "summary_failures": self.summary_failures,
+            "summaries_running": len(self._tasks),
+            "evictions": self.evictions
+        }
@@ -0,0 +1,616 @@
+# src/rag/vector_store.py
+import asyncio
+import json
+import os
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from src.logger import setup_logger
+
+logger = setup_logger("vector_store")
+
+QueryResult = Dict[str, List[List[Any]]]
+
+
+class ReadOnlyStoreError(RuntimeError):
+    """Raised when writing to a store that is served read-only, such as a snapshot"""
+
+
+class VectorStore(ABC):
+    """Storage and nearest-neighbour search for embedded chunks.
+
+    Query results use the same nested-list layout as Chroma's
+    ``collection.query`` (one inner list per query embedding) so callers do
+    not depend on the backend.
+    """
+
+    read_only = False
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored chunks"""
+
+    @abstractmethod
+    def upsert(
+        self,
+        ids: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+        documents: Sequence[str],
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None
+    ):
+        """Insert chunks, replacing any with the same ID"""
+
+    @abstractmethod
+    def delete(self, ids: Sequence[str]):
+        """Remove chunks by ID, ignoring unknown IDs"""
+
+    @abstractmethod
+    def existing_ids(self, ids: Sequence[str]) -> Set[str]:
+        """Return which of ids are stored"""
+
+    @abstractmethod
+    def get(self, ids: Sequence[str]) -> Dict[str, List[Any]]:
+        """Return ids, documents and embeddings of the stored chunks among ids"""
+
+    @abstractmethod
+    def iter_records(self, batch_size: int = 1000) -> Iterator[Dict[str, List[Any]]]:
+        """Yield every stored chunk as batches of ids, documents, metadatas and embeddings"""
+
+    @abstractmethod
+    def query(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        n_results: int = 4,
+        include_embeddings: bool = False
+    ) -> QueryResult:
+        """Return ids, documents, metadatas and distances of the nearest chunks.
+
+        With include_embeddings the result also has the chunk embeddings.
+        """
+
+    async def aget(self, ids: Sequence[str]) -> Dict[str, List[Any]]:
+        """Async get; by default runs the blocking get in a worker thread"""
+        return await asyncio.to_thread(self.get, ids)
+
+    async def aquery(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        n_results: int = 4,
+        include_embeddings: bool = False
+    ) -> QueryResult:
+        """Async query; by default runs the blocking query in a worker thread"""
+        return await asyncio.to_thread(self.query, query_embeddings, n_results, include_embeddings)
+
+    def persist(self):
+        """Flush pending changes to durable storage"""
+
+
+class ChromaVectorStore(VectorStore):
+    """Vector store backed by a Chroma collection over HTTP"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    @classmethod
+    def open(cls, collection_name: str, host: str, port: int) -> Tuple["ChromaVectorStore", bool]:
+        """Open the named collection, creating it if needed.
+
+        Returns the store and whether the collection was newly created.
+        """
+        import chromadb
+        from chromadb.config import Settings
+
+        client = chromadb.HttpClient(
+            host=host,
+            port=port,
+            settings=Settings(anonymized_telemetry=False)
+        )
+        try:
+            # Try to get existing collection first
+            collection = client.get_collection(name=collection_name)
+            logger.info(f"Using existing collection: {collection_name}")
+            return cls(collection), False
+        except Exception:
+            # Create new collection if it doesn't exist
+            collection = client.create_collection(name=collection_name, get_or_create=True)
+            logger.info(f"Created new collection: {collection_name}")
+            return cls(collection), True
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def upsert(self, ids, embeddings, documents, metadatas=None):
+        self.collection.upsert(
+            ids=list(ids),
+            embeddings=[list(e) for e in embeddings],
+            documents=list(documents),
+            metadatas=list(metadatas) if metadatas else None
+        )
+
+    def delete(self, ids):
+        if ids:
+            self.collection.delete(ids=list(ids))
+
+    def existing_ids(self, ids) -> Set[str]:
+        if not ids:
+            return set()
+        return set(self.collection.get(ids=list(ids), include=[])["ids"])
+
+    def get(self, ids) -> Dict[str, List[Any]]:
+        if not ids:
+            return {"ids": [], "documents": [], "embeddings": []}
+        result = self.collection.get(ids=list(ids), include=["documents", "embeddings"])
+        return {
+            "ids": result["ids"],
+            "documents": result["documents"],
+            "embeddings": [list(e) for e in result["embeddings"]]
+        }
+
+    def iter_records(self, batch_size: int = 1000) -> Iterator[Dict[str, List[Any]]]:
+        for offset in range(0, self.count(), batch_size):
+            result = self.collection.get(
+                include=["documents", "metadatas", "embeddings"],
+                limit=batch_size,
+                offset=offset
+            )
+            yield {
+                "ids": result["ids"],
+                "documents": result["documents"],
+                "metadatas": [dict(m or {}) for m in result["metadatas"]],
+                "embeddings": [list(e) for e in result["embeddings"]]
+            }
+
+    def query(self, query_embeddings, n_results: int = 4, include_embeddings: bool = False) -> QueryResult:
+        include = ["documents", "metadatas", "distances"]
+        if include_embeddings:
+            include.append("embeddings")
+        result = self.collection.query(
+            query_embeddings=[list(e) for e in query_embeddings],
+            n_results=n_results,
+            include=include
+        )
+        if include_embeddings:
+            result["embeddings"] = [[list(e) for e in row] for row in result["embeddings"]]
+        return result
+
+
+class NumpyVectorStore(VectorStore):
+    """In-process vector store using a normalized float32 matrix.
+
+    Search is a single matrix product followed by ``argpartition``, which is
+    well under a millisecond for a corpus of a few thousand chunks. Distances
+    are cosine distances (1 - cosine similarity). The store lives in memory and
+    is saved to ``store_dir`` by ``persist``. Reads and writes hold a lock, so
+    the indexing thread and the worker threads running queries can share it.
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    RECORDS_FILE = "records.json"
+
+    def __init__(self, store_dir: Optional[str] = None):
+        self.store_dir = Path(store_dir) if store_dir else None
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._size = 0
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    @classmethod
+    def open(cls, collection_name: str, base_dir: str) -> Tuple["NumpyVectorStore", bool]:
+        """Load the named store from disk, or start an empty one.
+
+        Returns the store and whether it was newly created.
+        """
+        store = cls(str(Path(base_dir) / collection_name))
+        if store.load():
+            logger.info(f"Loaded in-process store {collection_name} with {store.count()} chunks")
+            return store, False
+        logger.info(f"Created new in-process store: {collection_name}")
+        return store, True
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Normalized embeddings for the stored chunks, one row per ID"""
+        with self._lock:
+            return self._matrix[:self._size].copy()
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _reserve(self, rows: int, dim: int):
+        if self._matrix.shape[1] not in (0, dim):
+            raise ValueError(f"Embedding dimension {dim} does not match store dimension {self._matrix.shape[1]}")
+        if rows <= self._matrix.shape[0] and self._matrix.shape[1] == dim:
+            return
+        capacity = max(rows, 2 * self._matrix.shape[0], 64)
+        grown = np.zeros((capacity, dim), dtype=np.float32)
+        if self._size:
+            grown[:self._size] = self._matrix[:self._size]
+        self._matrix = grown
+
+    def count(self) -> int:
+        return self._size
+
+    def upsert(self, ids, embeddings, documents, metadatas=None):
+        if not ids:
+            return
+        vectors = self._normalize(np.asarray(embeddings, dtype=np.float32))
+        metadatas = metadatas or [{} for _ in ids]
+        with self._lock:
+            self._reserve(self._size + len(ids), vectors.shape[1])
+            for chunk_id, vector, document, metadata in zip(ids, vectors, documents, metadatas):
+                row = self._rows.get(chunk_id)
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._rows[chunk_id] = row
+                    self.ids.append(chunk_id)
+                    self.documents.append(document)
+                    self.metadatas.append(dict(metadata))
+                else:
+                    self.documents[row] = document
+                    self.metadatas[row] = dict(metadata)
+                self._matrix[row] = vector
+            self._dirty = True
+
+    def delete(self, ids):
+        with self._lock:
+            remove = {i for i in ids if i in self._rows}
+            if not remove:
+                return
+            keep = [row for row, chunk_id in enumerate(self.ids) if chunk_id not in remove]
+            self._matrix = self._matrix[keep].copy() if keep else np.zeros((0, self._matrix.shape[1]), dtype=np.float32)
+            self.ids = [self.ids[row] for row in keep]
+            self.documents = [self.documents[row] for row in keep]
+            self.metadatas = [self.metadatas[row] for row in keep]
+            self._rows = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+            self._size = len(self.ids)
+            self._dirty = True
+
+    def existing_ids(self, ids) -> Set[str]:
+        with self._lock:
+            return {i for i in ids if i in self._rows}
+
+    def get(self, ids) -> Dict[str, List[Any]]:
+        with self._lock:
+            rows = [self._rows[i] for i in ids if i in self._rows]
+            return {
+                "ids": [self.ids[row] for row in rows],
+                "documents": [self.documents[row] for row in rows],
+                "embeddings": list(self._matrix[rows])
+            }
+
+    def iter_records(self, batch_size: int = 1000) -> Iterator[Dict[str, List[Any]]]:
+        start = 0
+        while True:
+            # Copy one batch at a time so the lock is not held across yields
+            with self._lock:
+                end = min(start + batch_size, self._size)
+                if start >= end:
+                    return
+                batch = {
+                    "ids": self.ids[start:end],
+                    "documents": self.documents[start:end],
+                    "metadatas": self.metadatas[start:end],
+                    "embeddings": list(self._matrix[start:end].copy())
+                }
+            yield batch
+            start = end
+
+    def query(self, query_embeddings, n_results: int = 4, include_embeddings: bool = False) -> QueryResult:
+        result: QueryResult = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if include_embeddings:
+            result["embeddings"] = []
+        queries = self._normalize(np.asarray(query_embeddings, dtype=np.float32))
+        with self._lock:
+            k = min(n_results, self._size)
+            if k == 0:
+                for key in result:
+                    result[key] = [[] for _ in range(len(queries))]
+                return result
+
+            scores = self._matrix[:self._size] @ queries.T  # (num_chunks, num_queries)
+            for column in scores.T:
+                top = np.argpartition(-column, k - 1)[:k]
+                top = top[np.argsort(-column[top])]
+                result["ids"].append([self.ids[row] for row in top])
+                result["documents"].append([self.documents[row] for row in top])
+                result["metadatas"].append([self.metadatas[row] for row in top])
+                result["distances"].append((1.0 - column[top]).tolist())
+                if include_embeddings:
+                    result["embeddings"].append(self._matrix[top])
+        return result
+
+    def persist(self):
+        """Save vectors and records to store_dir atomically"""
+        with self._lock:
+            if self.store_dir is None or not self._dirty:
+                return
+            self.store_dir.mkdir(parents=True, exist_ok=True)
+            vectors_tmp = self.store_dir / (self.VECTORS_FILE + ".tmp")
+            records_tmp = self.store_dir / (self.RECORDS_FILE + ".tmp")
+            with open(vectors_tmp, "wb") as f:
+                np.save(f, self._matrix[:self._size])
+            with open(records_tmp, "w", encoding="utf-8") as f:
+                json.dump({"ids": self.ids, "documents": self.documents, "metadatas": self.metadatas}, f)
+            os.replace(vectors_tmp, self.store_dir / self.VECTORS_FILE)
+            os.replace(records_tmp, self.store_dir / self.RECORDS_FILE)
+            self._dirty = False
+
+    def load(self) -> bool:
+        """Load vectors and records from store_dir, returning False if absent"""
+        if self.store_dir is None:
+            return False
+        vectors_path = self.store_dir / self.VECTORS_FILE
+        records_path = self.store_dir / self.RECORDS_FILE
+        if not vectors_path.exists() or not records_path.exists():
+            return False
+        matrix = np.load(vectors_path)
+        records = json.loads(records_path.read_text(encoding="utf-8"))
+        if len(records["ids"]) != len(matrix):
+            logger.error(f"Store at {self.store_dir} is inconsistent, ignoring it")
+            return False
+        with self._lock:
+            self._matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+            self.ids = records["ids"]
+            self.documents = records["documents"]
+            self.metadatas = records["metadatas"]
+            self._rows = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+            self._size = len(self.ids)
+            self._dirty = False
+        return True
+
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_SCAN_ROWS = 16384  # Rows converted to float32 at a time while scanning
+
+
+def write_snapshot(
+    store: VectorStore,
+    snapshot_dir: str,
+    dtype: str = "float16",
+    quantize: bool = False,
+    batch_size: int = 1000,
+    **info: Any
+) -> Dict[str, Any]:
+    """Export every chunk of a store to a snapshot directory.
+
+    The snapshot holds the normalized vectors as one contiguous float16 or
+    float32 block (``vectors.npy``), the chunk texts back to back in
+    ``text.bin`` with their byte offsets in ``offsets.npy``, and the IDs and
+    deduplicated metadata in ``records.json``. With quantize, int8 vectors
+    and per-row scales are added for a faster first-pass scan. The directory
+    is written next to the target and swapped in at the end. Extra keyword
+    arguments are recorded in ``header.json``; the header is returned.
+    """
+    if dtype not in ("float16", "float32"):
+        raise ValueError(f"Unsupported snapshot dtype: {dtype}")
+    target = Path(snapshot_dir)
+    tmp_dir = target.with_name(target.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    ids: List[str] = []
+    metadata_rows: List[int] = []
+    metadata_index: Dict[str, int] = {}
+    offsets = [0]
+    blocks = []
+    with open(tmp_dir / SnapshotVectorStore.TEXT_FILE, "wb") as text_file:
+        for batch in store.iter_records(batch_size):
+            ids.extend(batch["ids"])
+            for document, metadata in zip(batch["documents"], batch["metadatas"]):
+                data = (document or "").encode("utf-8")
+                text_file.write(data)
+                offsets.append(offsets[-1] + len(data))
+                key = json.dumps(metadata or {}, sort_keys=True)
+                metadata_rows.append(metadata_index.setdefault(key, len(metadata_index)))
+            if batch["ids"]:
+                blocks.append(NumpyVectorStore._normalize(np.asarray(batch["embeddings"], dtype=np.float32)))
+    if not ids:
+        shutil.rmtree(tmp_dir)
+        raise ValueError("Nothing to snapshot: the store is empty")
+
+    vectors = np.concatenate(blocks)
+    np.save(tmp_dir / SnapshotVectorStore.VECTORS_FILE, vectors.astype(dtype))
+    np.save(tmp_dir / SnapshotVectorStore.OFFSETS_FILE, np.asarray(offsets, dtype=np.int64))
+    if quantize:
+        scales = np.abs(vectors).max(axis=1)
+        scales[scales == 0] = 1.0
+        scales /= 127.0
+        np.save(tmp_dir / SnapshotVectorStore.INT8_FILE, np.round(vectors / scales[:, None]).astype(np.int8))
+        np.save(tmp_dir / SnapshotVectorStore.SCALES_FILE, scales.astype(np.float32))
+    with open(tmp_dir / SnapshotVectorStore.RECORDS_FILE, "w", encoding="utf-8") as f:
+        json.dump({
+            "ids": ids,
+            "metadatas": [json.loads(key) for key in metadata_index],
+            "metadata_rows": metadata_rows
+        }, f)
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "count": len(ids),
+        "dim": int(vectors.shape[1]),
+        "dtype": dtype,
+        "quantized": quantize,
+        **info
+    }
+    (tmp_dir / SnapshotVectorStore.HEADER_FILE).write_text(json.dumps(header, indent=2), encoding="utf-8")
+
+    if target.exists():
+        old_dir = target.with_name(target.name + ".old")
+        if old_dir.exists():
+            shutil.rmtree(old_dir)
+        os.replace(target, old_dir)
+        os.replace(tmp_dir, target)
+        shutil.rmtree(old_dir)
+    else:
+        os.replace(tmp_dir, target)
+    logger.info(f"Wrote snapshot of {len(ids)} chunks to {target}")
+    return header
+
+
+class SnapshotVectorStore(VectorStore):
+    """Read-only store serving a snapshot written by :func:`write_snapshot`.
+
+    Vectors and texts are memory-mapped, so opening costs a few milliseconds
+    regardless of corpus size and pages are loaded on first use. Queries scan
+    the vector block (or, in quantized snapshots, the int8 block) in slices
+    and, when quantized, re-score the best ``rescore_factor * n_results``
+    candidates exactly with the stored float vectors.
+    """
+
+    read_only = True
+
+    HEADER_FILE = "header.json"
+    RECORDS_FILE = "records.json"
+    VECTORS_FILE = "vectors.npy"
+    TEXT_FILE = "text.bin"
+    OFFSETS_FILE = "offsets.npy"
+    INT8_FILE = "vectors_int8.npy"
+    SCALES_FILE = "scales.npy"
+    LEXICAL_DIR = "lexical"  # BM25 index built from this snapshot's texts
+
+    def __init__(self, snapshot_dir: str, rescore_factor: int = 4):
+        self.snapshot_dir = Path(snapshot_dir)
+        self.rescore_factor = max(1, rescore_factor)
+        self.header = json.loads((self.snapshot_dir / self.HEADER_FILE).read_text(encoding="utf-8"))
+        if self.header.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported snapshot format {self.header.get('format')} in {snapshot_dir}")
+        records = json.loads((self.snapshot_dir / self.RECORDS_FILE).read_text(encoding="utf-8"))
+        self.ids: List[str] = records["ids"]
+        self._metadatas: List[Dict[str, Any]] = records["metadatas"]
+        self._metadata_rows: List[int] = records["metadata_rows"]
+        self._rows = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+        self.vectors = np.load(self.snapshot_dir / self.VECTORS_FILE, mmap_mode="r")
+        self.offsets = np.load(self.snapshot_dir / self.OFFSETS_FILE, mmap_mode="r")
+        text_path = self.snapshot_dir / self.TEXT_FILE
+        self.text = np.memmap(text_path, dtype=np.uint8, mode="r") if text_path.stat().st_size else np.zeros(0, np.uint8)
+        self.quantized = None
+        if self.header.get("quantized"):
+            self.quantized = (
+                np.load(self.snapshot_dir / self.INT8_FILE, mmap_mode="r"),
+                np.load(self.snapshot_dir / self.SCALES_FILE)
+            )
+        if not len(self.ids) == len(self.vectors) == len(self.offsets) - 1:
+            raise ValueError(f"Snapshot at {snapshot_dir} is inconsistent")
+
+    @classmethod
+    def open(cls, collection_name: str, base_dir: str, rescore_factor: int = 4) -> Tuple["SnapshotVectorStore", bool]:
+        """Open the named snapshot; it must already exist"""
+        snapshot_dir = Path(base_dir) / collection_name
+        if not (snapshot_dir / cls.HEADER_FILE).exists():
+            raise FileNotFoundError(f"No snapshot found at {snapshot_dir}; export one with python -m src.snapshot export")
+        store = cls(str(snapshot_dir), rescore_factor)
+        logger.info(f"Memory-mapped snapshot {collection_name} with {store.count()} chunks ({store.header['dtype']})")
+        return store, False
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def upsert(self, ids, embeddings, documents, metadatas=None):
+        raise ReadOnlyStoreError(f"Snapshot at {self.snapshot_dir} is read-only; re-export the snapshot instead")
+
+    def delete(self, ids):
+        raise ReadOnlyStoreError(f"Snapshot at {self.snapshot_dir} is read-only; re-export the snapshot instead")
+
+    def existing_ids(self, ids) -> Set[str]:
+        return {i for i in ids if i in self._rows}
+
+    def document(self, row: int) -> str:
+        return bytes(self.text[self.offsets[row]:self.offsets[row + 1]]).decode("utf-8")
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        return dict(self._metadatas[self._metadata_rows[row]])
+
+    def get(self, ids) -> Dict[str, List[Any]]:
+        rows = [self._rows[i] for i in ids if i in self._rows]
+        return {
+            "ids": [self.ids[row] for row in rows],
+            "documents": [self.document(row) for row in rows],
+            "embeddings": [np.asarray(self.vectors[row], dtype=np.float32) for row in rows]
+        }
+
+    def iter_records(self, batch_size: int = 1000) -> Iterator[Dict[str, List[Any]]]:
+        for start in range(0, self.count(), batch_size):
+            rows = range(start, min(start + batch_size, self.count()))
+            yield {
+                "ids": [self.ids[row] for row in rows],
+                "documents": [self.document(row) for row in rows],
+                "metadatas": [self.metadata(row) for row in rows],
+                "embeddings": list(np.asarray(self.vectors[start:rows.stop], dtype=np.float32))
+            }
+
+    def _scan(self, queries: np.ndarray) -> np.ndarray:
+        """Similarity of every row to every query, (rows, queries)"""
+        matrix, scales = self.quantized if self.quantized is not None else (self.vectors, None)
+        scores = np.empty((len(matrix), len(queries)), dtype=np.float32)
+        for start in range(0, len(matrix), SNAPSHOT_SCAN_ROWS):
+            block = np.asarray(matrix[start:start + SNAPSHOT_SCAN_ROWS], dtype=np.float32)
+            scores[start:start + len(block)] = block @ queries.T
+        if scales is not None:
+            scores *= scales[:, None]
+        return scores
+
+    def query(self, query_embeddings, n_results: int = 4, include_embeddings: bool = False) -> QueryResult:
+        result: QueryResult = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if include_embeddings:
+            result["embeddings"] = []
+        queries = NumpyVectorStore._normalize(np.asarray(query_embeddings, dtype=np.float32))
+        k = min(n_results, self.count())
+        if k == 0:
+            for key in result:
+                result[key] = [[] for _ in range(len(queries))]
+            return result
+
+        scores = self._scan(queries)
+        candidates = min(self.count(), k * self.rescore_factor) if self.quantized is not None else k
+        for query, column in zip(queries, scores.T):
+            top = np.argpartition(-column, candidates - 1)[:candidates]
+            if self.quantized is not None:
+                # Exact re-scoring of the int8 shortlist with the float vectors
+                top = np.sort(top)
+                similarities = np.asarray(self.vectors[top], dtype=np.float32) @ query
+            else:
+                similarities = column[top]
+            order = np.argsort(-similarities)[:k]
+            top, similarities = top[order], similarities[order]
+            result["ids"].append([self.ids[row] for row in top])
+            result["documents"].append([self.document(row) for row in top])
+            result["metadatas"].append([self.metadata(row) for row in top])
+            result["distances"].append((1.0 - similarities).tolist())
+            if include_embeddings:
+                result["embeddings"].append(np.asarray(self.vectors[top], dtype=np.float32))
+        return result
+
+
+def open_vector_store(
+    backend: str,
+    collection_name: str,
+    chroma_host: str,
+    chroma_port: int,
+    store_dir: str,
+    snapshot_dir: Optional[str] = None,
+    rescore_factor: int = 4
+) -> Tuple[VectorStore, bool]:
+    """Open the configured vector store backend.
+
+    Returns the store and whether it was newly created.
+    """
+    if backend == "chroma":
+        return ChromaVectorStore.open(collection_name, chroma_host, chroma_port)
+    if backend == "numpy":
+        return NumpyVectorStore.open(collection_name, store_dir)
+    if backend == "snapshot":
+        return SnapshotVectorStore.open(collection_name, snapshot_dir or store_dir, rescore_factor)
+    raise ValueError(f"Unknown vector store backend: {backend}")
@@ -0,0 +1,115 @@
+# src/snapshot.py
+"""Export the guideline collection to a memory-mapped snapshot, or import one.
+
+Usage:
+    python -m src.snapshot export --backend chroma --dtype float16 --int8
+    python -m src.snapshot import --into numpy
+
+Serve a snapshot directly, without Chroma or re-embedding, by setting
+VECTOR_STORE_BACKEND=snapshot.
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from src.config import settings
+from src.logger import setup_logger
+from src.rag.vector_store import SnapshotVectorStore, open_vector_store, write_snapshot
+
+logger = setup_logger("snapshot")
+
+COLLECTION_NAME = "medical_guidelines_nomic"
+
+
+def export_snapshot(
+    backend: str,
+    snapshot_dir: str = settings.SNAPSHOT_DIR,
+    dtype: str = "float16",
+    quantize: bool = False,
+    collection_name: str = COLLECTION_NAME
+) -> Dict[str, Any]:
+    """Snapshot a collection from the chroma or numpy backend"""
+    store, created = open_vector_store(
+        backend,
+        collection_name,
+        chroma_host=settings.CHROMA_HOST,
+        chroma_port=settings.CHROMA_PORT,
+        store_dir=settings.VECTOR_STORE_DIR
+    )
+    if created or store.count() == 0:
+        raise ValueError(f"Collection {collection_name} on {backend} is empty; index it first")
+    start_time = time.time()
+    header = write_snapshot(
+        store,
+        str(Path(snapshot_dir) / collection_name),
+        dtype=dtype,
+        quantize=quantize,
+        collection=collection_name,
+        source_backend=backend,
+        embedding_model=settings.EMBEDDING_MODEL,
+        created_at=time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    )
+    header["seconds"] = round(time.time() - start_time, 2)
+    return header
+
+
+def import_snapshot(
+    backend: str,
+    snapshot_dir: str = settings.SNAPSHOT_DIR,
+    collection_name: str = COLLECTION_NAME,
+    batch_size: int = settings.INDEX_WRITE_BATCH_SIZE
+) -> Dict[str, Any]:
+    """Load a snapshot into the chroma or numpy backend without re-embedding.
+
+    The next server start adopts the imported chunks into the index manifest
+    as it re-chunks DATA_PATH, so nothing is embedded again as long as the
+    chunking settings match the ones the snapshot was built with.
+    """
+    snapshot, _ = SnapshotVectorStore.open(collection_name, snapshot_dir)
+    store, _ = open_vector_store(
+        backend,
+        collection_name,
+        chroma_host=settings.CHROMA_HOST,
+        chroma_port=settings.CHROMA_PORT,
+        store_dir=settings.VECTOR_STORE_DIR
+    )
+    start_time = time.time()
+    for batch in snapshot.iter_records(batch_size):
+        store.upsert(batch["ids"], batch["embeddings"], batch["documents"], batch["metadatas"])
+        logger.info(f"Imported {len(batch['ids'])} chunks")
+    store.persist()
+    return {
+        "backend": backend,
+        "collection": collection_name,
+        "chunks": snapshot.count(),
+        "store_count": store.count(),
+        "seconds": round(time.time() - start_time, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import a collection snapshot")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Write a snapshot of the collection")
+    export_parser.add_argument("--backend", default=settings.VECTOR_STORE_BACKEND, choices=["chroma", "numpy"])
+    export_parser.add_argument("--dtype", default="float16", choices=["float16", "float32"])
+    export_parser.add_argument("--int8", action="store_true", help="Add int8 vectors for a faster first-pass scan")
+    export_parser.add_argument("--snapshot-dir", default=settings.SNAPSHOT_DIR)
+
+    import_parser = subparsers.add_parser("import", help="Load a snapshot into a writable backend")
+    import_parser.add_argument("--into", default=settings.VECTOR_STORE_BACKEND, choices=["chroma", "numpy"])
+    import_parser.add_argument("--snapshot-dir", default=settings.SNAPSHOT_DIR)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        report = export_snapshot(args.backend, args.snapshot_dir, args.dtype, args.int8)
+    else:
+        report = import_snapshot(args.into, args.snapshot_dir)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()